@@ -1,45 +1,309 @@
 import time
-from flask import Flask, flash, redirect, render_template, request, session, url_for, jsonify
+import base64
+import logging
+import atexit
+import hashlib
+import hmac
+import re
+import itertools
+import html
+import csv
+import click
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from flask import Flask, flash, redirect, render_template, request, session, url_for, jsonify, g, Response, stream_with_context
 import mariadb
 import os
 from werkzeug.utils import secure_filename
-from PIL import Image
-
-def get_db_connection():
-    try:
-        conn = mariadb.connect(
-            user="user",
-            password="123",
-            host="127.0.0.1",
-            port=3305,
-            database="db"
-        )
-        return conn
-    except mariadb.Error as e:
-        print(f"DB Connection Error: {e}")
-        return None
+from .pool import ConnectionPool, PoolTimeout
+from .cache import ResponseCache
+from .events import EventBroadcaster, TooManySubscribers
+from .images import ImageProcessor
+from .blobs import BlobStore, UploadRejected
+from .serializers import CATEGORY_NAMES, dumps, ticket_list_items, ticket_ndjson_lines
+from .importer import ImportReport, clean_complaint, import_complaints, read_rows
+from .schema import TICKET_STATUSES
+from .repository import TICKET_FILTERS, Profile, Repository, query_stats
+from .config import DATABASE
+from .metrics import (
+    DB_ACQUIRE_SECONDS, IMAGE_PROCESSING_FAILURES, IMAGE_PROCESSING_SECONDS, PASSWORD_HASH_SECONDS,
+    PASSWORD_HASHER_BUSY, REQUEST_SECONDS, registry as metrics_registry
+)
+from .passwords import DEFAULT_PARAMS as PASSWORD_DEFAULT_PARAMS, HasherBusy, PasswordHasher, calibrate
+from .logs import RouteSampler, request_id_from, setup_logging
 
 app = Flask(__name__, instance_relative_config=True)
 app.secret_key = "utc_secret_key_2025"
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB máximo
+app.config['DATABASE'] = dict(DATABASE)
+app.config['DB_POOL_SIZE'] = 10
+app.config['DB_POOL_TIMEOUT'] = 5.0  # segundos esperando una conexión libre
+app.config['DB_POOL_PING_INTERVAL'] = 30.0  # segundos de inactividad antes de hacer ping
+
+db_pool = ConnectionPool(
+    lambda: mariadb.connect(**app.config['DATABASE']),
+    size=app.config['DB_POOL_SIZE'],
+    timeout=app.config['DB_POOL_TIMEOUT'],
+    ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+    on_checkout=DB_ACQUIRE_SECONDS.observe
+)
+
+# Caché de respuestas JSON de los endpoints de lectura (TTL en segundos)
+app.config['CACHE_MAX_ENTRIES'] = 512
+app.config['CACHE_TTLS'] = {
+    'tickets': 30,
+    'stats': 15,
+    'ticket': 60
+}
+
+response_cache = ResponseCache(max_entries=app.config['CACHE_MAX_ENTRIES'])
+
+# Eventos de tickets para los paneles (SSE)
+app.config['EVENTS_QUEUE_SIZE'] = 100
+app.config['EVENTS_HEARTBEAT'] = 15.0  # segundos entre latidos
+app.config['EVENTS_MAX_CLIENTS'] = 100  # cada cliente conectado ocupa un hilo
+
+ticket_events = EventBroadcaster(
+    max_queue=app.config['EVENTS_QUEUE_SIZE'],
+    max_clients=app.config['EVENTS_MAX_CLIENTS']
+)
+
+# Optimización de imágenes en segundo plano
+app.config['IMAGE_WORKERS'] = 2
+
+image_processor = ImageProcessor(workers=app.config['IMAGE_WORKERS'])
+
+# Adjuntos direccionados por contenido: static/uploads/blobs/ab/cd/<sha256>.<ext>
+app.config['BLOB_GC_GRACE'] = 3600  # segundos antes de borrar un blob sin referencias
+
+blob_store = BlobStore(os.path.join(app.static_folder, 'uploads', 'blobs'))
+
+# Contraseñas con scrypt. Coste ajustable (flask --app flaskr calibrate-passwords);
+# los hashes con otros parámetros o en texto plano se rehacen al iniciar sesión
+app.config['PASSWORD_HASH_PARAMS'] = dict(PASSWORD_DEFAULT_PARAMS)
+app.config['PASSWORD_HASH_WORKERS'] = max(1, (os.cpu_count() or 2) // 2)
+app.config['PASSWORD_HASH_MAX_PENDING'] = app.config['PASSWORD_HASH_WORKERS'] * 8
+
+password_hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_PARAMS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING']
+)
+
+# Métricas de Prometheus en /metrics: con un token se exige "Authorization: Bearer <token>";
+# sin token solo responde a administradores y a peticiones desde la propia máquina
+# (detrás de un proxy local todas lo parecen: en ese caso hay que definir el token)
+app.config['METRICS_TOKEN'] = os.environ.get('TICKETS_METRICS_TOKEN') or None
+METRICS_LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Logs JSON en stderr a través de una cola; el nivel se puede cambiar en marcha con /api/logging
+app.config['LOG_LEVEL'] = os.environ.get('TICKETS_LOG_LEVEL', 'INFO').upper()
+app.config['LOG_QUEUE_SIZE'] = 10000
+app.config['LOG_SLOW_REQUEST_MS'] = 1000
+# Fracción de peticiones de las rutas más llamadas que se registran en el log de
+# acceso; las lentas y las que fallan (>= 500) se registran siempre
+app.config['LOG_SAMPLE_RATES'] = {
+    '/api/tickets': 0.05,
+    '/api/tickets/stats': 0.05,
+    '/api/tickets/<int:ticket_id>': 0.1,
+    '/check-session': 0.05,
+    '/metrics': 0.0,
+    '/static/<path:filename>': 0.0
+}
+
+logger = logging.getLogger(__name__)
+log_handler, log_listener = setup_logging(__name__, app.config['LOG_LEVEL'], app.config['LOG_QUEUE_SIZE'])
+atexit.register(log_listener.stop)
+access_sampler = RouteSampler(app.config['LOG_SAMPLE_RATES'])
 
-def get_user_by_credentials(email, password):
+def get_db_connection():
+    """Conexión del pool asociada a la petición actual (se devuelve en el teardown)"""
+    if "db_conn" not in g:
+        try:
+            g.db_conn = db_pool.acquire()
+        except (mariadb.Error, PoolTimeout) as e:
+            logger.error("DB Connection Error: %s", e)
+            return None
+    return g.db_conn
+
+def get_repository():
+    """Repository sobre la conexión de la petición actual, o None si no hay conexión"""
     conn = get_db_connection()
-    if not conn:
+    return Repository(conn) if conn else None
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        db_pool.release(conn)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_id = request_id_from(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def record_request_duration(response):
+    # Se etiqueta por regla de la ruta (no por URL) para acotar las series;
+    # en respuestas en streaming mide hasta que empieza el cuerpo
+    started = g.get("request_started")
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else "<sin ruta>"
+    REQUEST_SECONDS.observe(duration, request.method, route, response.status_code)
+    response.headers["X-Request-ID"] = g.request_id
+
+    duration_ms = round(duration * 1000, 2)
+    slow = duration_ms >= app.config['LOG_SLOW_REQUEST_MS']
+    if slow or response.status_code >= 500 or access_sampler.sample(route):
+        logger.log(logging.WARNING if slow or response.status_code >= 500 else logging.INFO, "request", extra={
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': duration_ms
+        })
+    return response
+
+def upload_relative_path(abs_path):
+    """Ruta relativa a static ("uploads/...") de un archivo subido"""
+    return os.path.relpath(abs_path, app.static_folder).replace(os.sep, '/')
+
+def schedule_image_optimization(blob):
+    """Genera los derivados de la imagen del blob en el pool de procesos; al
+    terminar actualiza el blob y todos los adjuntos que lo referencian.
+    """
+    sha256 = blob.sha256
+    file_path = os.path.join(app.static_folder, blob.file_path)
+
+    def on_done(future):
+        thumb_path = medium_path = None
+        try:
+            result = future.result()
+            IMAGE_PROCESSING_SECONDS.observe(result['seconds'], blob.file_type)
+            thumb_path = upload_relative_path(result['derivatives']['thumb'])
+            medium_path = upload_relative_path(result['derivatives']['medium'])
+            status = 'ready'
+        except Exception as e:
+            logger.warning("Procesamiento de imagen fallido", extra={'file_path': file_path, 'error': str(e)})
+            IMAGE_PROCESSING_FAILURES.inc(blob.file_type)
+            status = 'failed'
+        # Fuera de la petición: la conexión se pide directamente al pool
+        conn = None
+        try:
+            conn = db_pool.acquire()
+            repo = Repository(conn)
+            repo.finish_blob_processing(sha256, status, thumb_path, medium_path)
+            repo.commit()
+            response_cache.invalidate("tickets:", "ticket:")
+        except (mariadb.Error, PoolTimeout) as e:
+            logger.error("Error actualizando estado del blob", extra={'sha256': sha256, 'error': str(e)})
+        finally:
+            if conn is not None:
+                db_pool.release(conn)
+
+    try:
+        image_processor.submit(file_path, on_done)
+    except Exception as e:
+        # El ticket ya está guardado: el blob queda como fallido en lugar de
+        # convertir la petición en un error
+        failed = Future()
+        failed.set_exception(e)
+        on_done(failed)
+
+def listing_image(blob):
+    """Imagen del blob para los listados en vivo: la miniatura, el original si el
+    procesamiento falló o None mientras sigue pendiente"""
+    if blob.processing_status == 'pending':
+        return None
+    return blob.thumb_path or blob.file_path
+
+def collect_blob_garbage(grace_seconds):
+    """Recalcula las referencias de los blobs y borra los que no usa ningún adjunto,
+    así como los archivos del almacén sin fila en blobs.
+
+    Solo se borra lo que lleva más de grace_seconds sin tocarse, para no competir
+    con subidas en curso. Devuelve (blobs borrados, archivos huérfanos borrados).
+    """
+    conn = db_pool.acquire()
+    try:
+        repo = Repository(conn)
+        repo.recount_blob_refs()
+        repo.commit()
+
+        cutoff = time.time() - grace_seconds
+        removed_blobs = 0
+        for sha256, *paths in repo.unreferenced_blobs():
+            abs_paths = [os.path.join(app.static_folder, path) for path in paths if path]
+            if any(os.path.exists(path) and os.path.getmtime(path) >= cutoff for path in abs_paths):
+                continue
+            deleted = repo.delete_unreferenced_blob(sha256)
+            repo.commit()
+            if deleted:
+                removed_blobs += 1
+                for path in abs_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        known_paths = {os.path.join(app.static_folder, path) for path in repo.blob_paths()}
+        removed_files = blob_store.remove_unknown_files(known_paths, grace_seconds)
+        return removed_blobs, removed_files
+    finally:
+        db_pool.release(conn)
+
+@app.cli.command("gc-blobs")
+@click.option("--grace", default=None, type=int, help="Segundos mínimos sin uso antes de borrar")
+def gc_blobs_command(grace):
+    """Borra blobs de adjuntos sin referencias (flask --app flaskr gc-blobs)"""
+    grace = app.config['BLOB_GC_GRACE'] if grace is None else grace
+    removed_blobs, removed_files = collect_blob_garbage(grace)
+    click.echo(f"✅ Blobs borrados: {removed_blobs}, archivos huérfanos borrados: {removed_files}")
+
+def get_user_by_credentials(email, password):
+    """Usuario si la contraseña es correcta, o None. Una sola consulta por email;
+    la contraseña se comprueba en el pool del KDF (lanza HasherBusy si está lleno)."""
+    repo = get_repository()
+    if not repo:
         return None
     
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT id, email, password, user_id, role, name, last_name, study_area, study_speciality, term FROM users WHERE email = ? AND password = ? AND is_active = TRUE", (email, password))
-        user = cur.fetchone()
-        cur.close()
-        conn.close()
-        return user
+        user = repo.user_by_email(email)
     except mariadb.Error as e:
-        print(f"Error al obtener usuario: {e}")
+        logger.error("Error al obtener usuario: %s", e)
         return None
 
+    started = time.perf_counter()
+    try:
+        valid = password_hasher.verify(password, user.password if user else None)
+    except HasherBusy:
+        PASSWORD_HASHER_BUSY.inc()
+        raise
+    PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started)
+    if not valid:
+        return None
+
+    # Migración transparente: texto plano o parámetros antiguos -> hash actual
+    if password_hasher.needs_rehash(user.password):
+        try:
+            repo.update_password_hash(user.id, password_hasher.hash(password))
+            repo.commit()
+        except (mariadb.Error, HasherBusy) as e:
+            repo.rollback()
+            logger.warning("No se pudo rehacer el hash de la contraseña", extra={'user_id': user.id, 'error': str(e)})
+    return user
+
+@app.cli.command("calibrate-passwords")
+@click.option("--target", default=20.0, type=float, help="Inicios de sesión por segundo y núcleo que se quieren sostener")
+def calibrate_passwords_command(target):
+    """Mide scrypt en esta máquina y recomienda PASSWORD_HASH_PARAMS para --target"""
+    results, recommended = calibrate(target)
+    for n, ms, per_second in results:
+        click.echo(f"n=2^{n.bit_length() - 1:<3} {ms:8.1f} ms/hash  {per_second:8.1f} inicios/s por núcleo")
+    click.echo(f"Recomendado para {target:g}/s por núcleo: {recommended} "
+               f"(actual: {app.config['PASSWORD_HASH_PARAMS']}, {app.config['PASSWORD_HASH_WORKERS']} hilos)")
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -61,7 +325,13 @@ def login():
                 "message": "Email y contraseña son requeridos"
             }), 400
         
-        user = get_user_by_credentials(email, password)
+        try:
+            user = get_user_by_credentials(email, password)
+        except HasherBusy:
+            return jsonify({
+                "success": False,
+                "message": "Demasiados inicios de sesión en este momento, intenta de nuevo"
+            }), 503
         
         if not user:
             return jsonify({
@@ -69,23 +339,15 @@ def login():
                 "message": "Credenciales incorrectas"
             }), 401
         
-        session["user_id"] = user[0]
-        session["email"] = user[1]
-        session["user_code"] = user[3]
-        session["role"] = user[4]
-        session["name"] = user[5]
-        session["last_name"] = user[6]
-        session["study_area"] = user[7]
-        session["study_speciality"] = user[8]
-        session["term"] = user[9]
-        
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (user[0],))
-            conn.commit()
-            cur.close()
-            conn.close()
+        session["user_id"] = user.id
+        session["email"] = user.email
+        session["user_code"] = user.user_code
+        session["role"] = user.role
+        session["name"] = user.name
+        session["last_name"] = user.last_name
+        session["study_area"] = user.study_area
+        session["study_speciality"] = user.study_speciality
+        session["term"] = user.term
         
         redirect_url = "/"
         
@@ -93,17 +355,17 @@ def login():
             "success": True,
             "message": "Inicio de sesión exitoso",
             "user": {
-                "id": user[0],
-                "email": user[1],
-                "role": user[4],
-                "name": user[5],
-                "last_name": user[6]
+                "id": user.id,
+                "email": user.email,
+                "role": user.role,
+                "name": user.name,
+                "last_name": user.last_name
             },
             "redirect": redirect_url
         }), 200
         
-    except Exception as e:
-        print(f"Error en login: {e}")
+    except Exception:
+        logger.exception("Error en login")
         return jsonify({
             "success": False,
             "message": "Error interno del servidor"
@@ -117,279 +379,374 @@ def logout():
 
 # ========== TICKETS ==========
 
+# Exportación NDJSON: filas leídas del cursor por lotes
+EXPORT_BATCH_SIZE = 500
+
+def export_tickets_ndjson(repo, filters):
+    """Exporta los tickets que cumplen los filtros del listado como NDJSON sin
+    cargarlos todos en memoria"""
+    batches = repo.iter_tickets(EXPORT_BATCH_SIZE, filters)
+    # La consulta se lanza ya: un error llega a la ruta antes de empezar la respuesta
+    first = next(batches, [])
+
+    def generate():
+        try:
+            if first:
+                yield ticket_ndjson_lines(first)
+            for rows in batches:
+                yield ticket_ndjson_lines(rows)
+        except mariadb.Error as e:
+            logger.error("Error exporting tickets: %s", e)
+        finally:
+            batches.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Paginación por cursor (created_at, id) de los listados de tickets
+TICKETS_PAGE_SIZE = 50
+TICKETS_MAX_PAGE_SIZE = 200
+
+def encode_cursor(created_at, ticket_id):
+    raw = f"{created_at.strftime('%Y-%m-%d %H:%M:%S')}|{ticket_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Devuelve (created_at, id) del cursor; lanza ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, ticket_id = raw.split('|')
+        return datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S'), int(ticket_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Cursor no válido: {cursor}") from e
+
+def get_page_args():
+    """Lee limit y cursor de la query string"""
+    limit = request.args.get('limit', TICKETS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, TICKETS_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+def next_page_cursor(results, limit):
+    """Cursor de la siguiente página; las consultas piden limit + 1 filas para saber si hay más"""
+    if len(results) <= limit:
+        return None
+    last = results[limit - 1]
+    return encode_cursor(last.created_at, last.id)
+
+def make_etag(key, *version):
+    """ETag fuerte a partir de la clave del recurso y su sello de versión (no del cuerpo)"""
+    return hashlib.sha1(repr((key,) + version).encode()).hexdigest()
+
+def not_modified(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def json_response(body, etag):
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def cached_response(key):
+    """Respuesta desde la caché (304 si el cliente ya tiene esa versión), o None si no hay entrada vigente"""
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    body, etag = entry
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    return json_response(body, etag)
+
+def cache_response(key, ttl_name, payload, etag):
+    """Serializa el payload una sola vez, lo guarda en caché y lo devuelve como respuesta"""
+    body = dumps(payload) + "\n"
+    response_cache.set(key, (body, etag), app.config['CACHE_TTLS'][ttl_name])
+    return json_response(body, etag)
+
+def parse_ticket_filters(args):
+    """Filtros del listado a partir de la query string, en forma canónica.
+
+    status, category y complaint_type aceptan varios valores (repetidos o
+    separados por comas); user_id es un entero; from y to son fechas
+    YYYY-MM-DD (ambas incluidas). Lanza ValueError si alguno no es válido.
+    """
+    filters = {}
+    for name, (_, allowed) in TICKET_FILTERS.items():
+        values = sorted({value for arg in args.getlist(name) for value in arg.split(',') if value})
+        for value in values:
+            if value not in allowed:
+                raise ValueError(f"Valor no válido para {name}: {value}")
+        if values:
+            filters[name] = tuple(values)
+    if args.get('user_id'):
+        try:
+            filters['user_id'] = int(args['user_id'])
+        except ValueError:
+            raise ValueError(f"user_id no válido: {args['user_id']}") from None
+    for name in ('from', 'to'):
+        if args.get(name):
+            try:
+                filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f"Fecha no válida para {name}: {args[name]} (formato YYYY-MM-DD)") from None
+    return filters
+
+def filters_key(filters):
+    """Representación estable de los filtros para claves de caché y ETags"""
+    parts = []
+    for name in sorted(filters):
+        value = filters[name]
+        parts.append(f"{name}={','.join(value) if isinstance(value, tuple) else value}")
+    return "&".join(parts) or "todos"
+
+def user_tickets_forbidden(user_id):
+    """Respuesta de error si la sesión no puede ver los tickets de user_id, o None"""
+    if "user_id" not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    if session["user_id"] != user_id and session.get("role") != "admin":
+        return jsonify({'error': 'No autorizado'}), 403
+    return None
+
+def invalidate_ticket_caches(*ticket_ids):
+    """Invalida listados y estadísticas, y el detalle de los tickets indicados"""
+    prefixes = ["tickets:", "stats"]
+    prefixes += [f"ticket:{ticket_id}:" for ticket_id in ticket_ids]
+    response_cache.invalidate(*prefixes)
+
 @app.route('/api/tickets')
 def get_tickets():
-    conn = get_db_connection()
-    if not conn:
+    try:
+        filters = parse_ticket_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if 'user_id' in filters:
+        forbidden = user_tickets_forbidden(filters['user_id'])
+        if forbidden:
+            return forbidden
+    if request.args.get('format') == 'ndjson':
+        repo = get_repository()
+        if not repo:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        try:
+            return export_tickets_ndjson(repo, filters)
+        except mariadb.Error as e:
+            logger.error("Error exporting tickets: %s", e)
+            return jsonify({'error': 'Error al exportar los tickets'}), 500
+    return list_tickets(filters)
+
+def list_tickets(filters, **extra):
+    """Página del listado con los filtros dados (caché, ETag y cursor incluidos)"""
+    try:
+        limit, after = get_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # extra cambia el cuerpo (rutas por categoría o usuario), así que entra en la
+    # clave de la caché y del ETag junto con los filtros
+    extra_key = ",".join(f"{name}={value}" for name, value in sorted(extra.items()))
+    cache_key = f"tickets:{filters_key(filters)}:{limit}:{request.args.get('cursor', '')}:{extra_key}"
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    repo = get_repository()
+    if not repo:
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     try:
-        cur = conn.cursor()
-        # Obtener datos básicos del ticket
-        query = """
-            SELECT c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date,
-                   c.status, c.created_at, u.name, u.last_name, u.avatar_initials
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE u.is_active = TRUE
-            ORDER BY c.created_at DESC
-        """
-        cur.execute(query)
-        results = cur.fetchall()
-        category_names = {
-            'servicios-academicos': 'Servicios Académicos',
-            'infraestructura': 'Infraestructura',
-            'servicios-estudiantiles': 'Servicios Estudiantiles',
-            'tecnologia': 'Tecnología',
-            'administrativo': 'Administrativo',
-            'biblioteca': 'Biblioteca',
-            'cafeteria': 'Cafetería',
-            'otro': 'Otro'
-        }
-        tickets = []
-        for row in results:
-            ticket_id = row[0]
-            # Imagen del usuario: primer archivo imagen de complaint_attachments
-            cur.execute("""
-                SELECT file_path FROM complaint_attachments 
-                WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-                ORDER BY id ASC LIMIT 1
-            """, (ticket_id,))
-            user_img_row = cur.fetchone()
-            user_image = user_img_row[0] if user_img_row else ""
-
-            # Imagen del admin: primer archivo imagen de resolution_images
-            cur.execute("""
-                SELECT file_path FROM resolution_images
-                WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-                ORDER BY id ASC LIMIT 1
-            """, (ticket_id,))
-            admin_img_row = cur.fetchone()
-            admin_image = admin_img_row[0] if admin_img_row else ""
-
-            ticket = {
-                'id': ticket_id,
-                'complaint_type': row[1],
-                'category': row[2],
-                'categoryName': category_names.get(row[2], row[2].title()),
-                'title': row[3],
-                'content': row[4],
-                'incident_date': row[5].strftime('%Y-%m-%d') if row[5] else None,
-                'status': row[6],
-                'date': row[7].strftime('%Y-%m-%d'),
-                'created_at': row[7].strftime('%Y-%m-%d %H:%M:%S'),
-                'user': {
-                    'name': row[8],
-                    'last_name': row[9],
-                    'initials': row[10] if row[10] else f"{row[8][0]}{row[9][0]}".upper()
-                },
-                'user_image': user_image,
-                'admin_image': admin_image,
-                'priority': 'media' # Si tienes prioridad, cámbialo
-            }
-            tickets.append(ticket)
-        cur.close()
-        conn.close()
-        return jsonify({'success': True, 'tickets': tickets, 'total': len(tickets)})
+        etag = make_etag(cache_key, *repo.tickets_version(filters))
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        # Se pide una fila de más para saber si hay otra página
+        results = repo.list_tickets(filters, limit + 1, after)
+        next_cursor = next_page_cursor(results, limit)
+        tickets = ticket_list_items(results[:limit])
+        return cache_response(cache_key, 'tickets', {
+            'success': True,
+            'tickets': tickets,
+            'total': len(tickets),
+            **extra,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }, etag)
     except mariadb.Error as e:
-        print(f"Error fetching tickets: {e}")
-        if conn:
-            conn.close()
+        logger.error("Error fetching tickets: %s", e)
         return jsonify({'error': 'Error al obtener los tickets'}), 500
 
+# Rutas anteriores por dimensión: equivalen a /api/tickets?category=... y ?user_id=...
 @app.route('/api/tickets/filter/<category>')
 def get_tickets_by_category(category):
     if category == 'todos':
         return get_tickets()
-    conn = get_db_connection()
-    if not conn:
+    return list_tickets({'category': (category,)}, category=category)
+
+# Búsqueda de texto completo (índice FULLTEXT sobre subject y description)
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_TERMS = 10
+SEARCH_SNIPPET_WIDTH = 160
+# innodb_ft_min_token_size y la lista INNODB_FT_DEFAULT_STOPWORD: InnoDB no indexa
+# estas palabras, así que como término obligatorio (+palabra*) vaciarían el resultado
+SEARCH_MIN_TERM_LENGTH = 3
+SEARCH_STOPWORDS = frozenset((
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for",
+    "from", "how", "i", "in", "is", "it", "la", "of", "on", "or", "that", "the",
+    "this", "to", "was", "what", "when", "where", "who", "will", "with", "und", "www"
+))
+
+def search_terms(query):
+    """Palabras indexables de la búsqueda, sin repetir ni operadores del modo booleano"""
+    terms = (
+        term for term in re.findall(r"\w+", query.lower())
+        if len(term) >= SEARCH_MIN_TERM_LENGTH and term not in SEARCH_STOPWORDS
+    )
+    return list(dict.fromkeys(terms))[:SEARCH_MAX_TERMS]
+
+def boolean_search_query(terms):
+    """Todas las palabras son obligatorias y se buscan como prefijo (+palabra*)"""
+    return " ".join(f"+{term}*" for term in terms)
+
+def highlight(text, terms, start=0, end=None):
+    """Fragmento de texto escapado con las coincidencias envueltas en <mark>"""
+    end = len(text) if end is None else end
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE)
+    parts = []
+    position = start
+    for match in pattern.finditer(text, start, end):
+        parts.append(html.escape(text[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(text[position:end]))
+    return "".join(parts)
+
+def search_snippet(text, terms, width=SEARCH_SNIPPET_WIDTH):
+    """Ventana de la descripción alrededor de la primera coincidencia, resaltada"""
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")", re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    end = min(len(text), start + width)
+    snippet = highlight(text, terms, start, end)
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+@app.route('/api/tickets/search')
+def search_tickets():
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({'error': 'No autorizado'}), 403
+    query = request.args.get('q', '')
+    terms = search_terms(query)
+    if not terms:
+        if not query.strip():
+            return jsonify({'error': 'El parámetro q es requerido'}), 400
+        return jsonify({'error': f'La búsqueda necesita palabras de al menos {SEARCH_MIN_TERM_LENGTH} letras'}), 400
+    status = request.args.get('status') or None
+    category = request.args.get('category') or None
+    if status and status not in TICKET_STATUSES:
+        return jsonify({'error': f'Estado no válido: {status}'}), 400
+    if category and category not in CATEGORY_NAMES:
+        return jsonify({'error': f'Categoría no válida: {category}'}), 400
+    limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), TICKETS_MAX_PAGE_SIZE))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    repo = get_repository()
+    if not repo:
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     try:
-        cur = conn.cursor()
-        query = """
-            SELECT c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date,
-                   c.status, c.created_at, u.name, u.last_name, u.avatar_initials
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE u.is_active = TRUE AND c.category = ?
-            ORDER BY c.created_at DESC
-        """
-        cur.execute(query, (category,))
-        results = cur.fetchall()
-        category_names = {
-            'servicios-academicos': 'Servicios Académicos',
-            'infraestructura': 'Infraestructura',
-            'servicios-estudiantiles': 'Servicios Estudiantiles',
-            'tecnologia': 'Tecnología',
-            'administrativo': 'Administrativo',
-            'biblioteca': 'Biblioteca',
-            'cafeteria': 'Cafetería',
-            'otro': 'Otro'
-        }
+        filters = {}
+        if status:
+            filters['status'] = (status,)
+        if category:
+            filters['category'] = (category,)
+        results = repo.search_tickets(boolean_search_query(terms), filters, limit + 1, offset)
+        has_more = len(results) > limit
         tickets = []
-        for row in results:
-            ticket_id = row[0]
-            cur.execute("""
-                SELECT file_path FROM complaint_attachments 
-                WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-                ORDER BY id ASC LIMIT 1
-            """, (ticket_id,))
-            user_img_row = cur.fetchone()
-            user_image = user_img_row[0] if user_img_row else ""
-
-            cur.execute("""
-                SELECT file_path FROM resolution_images
-                WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-                ORDER BY id ASC LIMIT 1
-            """, (ticket_id,))
-            admin_img_row = cur.fetchone()
-            admin_image = admin_img_row[0] if admin_img_row else ""
-
-            ticket = {
-                'id': ticket_id,
-                'complaint_type': row[1],
-                'category': row[2],
-                'categoryName': category_names.get(row[2], row[2].title()),
-                'title': row[3],
-                'content': row[4],
-                'incident_date': row[5].strftime('%Y-%m-%d') if row[5] else None,
-                'status': row[6],
-                'date': row[7].strftime('%Y-%m-%d'),
-                'created_at': row[7].strftime('%Y-%m-%d %H:%M:%S'),
-                'user': {
-                    'name': row[8],
-                    'last_name': row[9],
-                    'initials': row[10] if row[10] else f"{row[8][0]}{row[9][0]}".upper()
-                },
-                'user_image': user_image,
-                'admin_image': admin_image,
-                'priority': 'media'
-            }
+        for row in results[:limit]:
+            ticket = row.to_dict()
+            ticket['score'] = round(float(row.score), 4)
+            ticket['title_highlight'] = highlight(row.subject, terms)
+            ticket['snippet'] = search_snippet(row.description, terms)
             tickets.append(ticket)
-        cur.close()
-        conn.close()
         return jsonify({
             'success': True,
             'tickets': tickets,
             'total': len(tickets),
-            'category': category
+            'query': " ".join(terms),
+            'next_offset': offset + limit if has_more else None,
+            'has_more': has_more
         })
     except mariadb.Error as e:
-        print(f"Error filtering tickets: {e}")
-        if conn:
-            conn.close()
-        return jsonify({'error': 'Error al filtrar los tickets'}), 500
+        logger.error("Error searching tickets: %s", e)
+        return jsonify({'error': 'Error al buscar tickets'}), 500
 
 @app.route('/api/tickets/stats')
 def get_tickets_stats():
-    conn = get_db_connection()
-    if not conn:
+    cached = cached_response("stats")
+    if cached is not None:
+        return cached
+    repo = get_repository()
+    if not repo:
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     try:
-        cur = conn.cursor()
-        status_query = """
-            SELECT status, COUNT(*) as count
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE u.is_active = TRUE
-            GROUP BY status
-        """
-        cur.execute(status_query)
-        status_results = cur.fetchall()
-        category_query = """
-            SELECT category, COUNT(*) as count
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE u.is_active = TRUE
-            GROUP BY category
-        """
-        cur.execute(category_query)
-        category_results = cur.fetchall()
-        total_query = """
-            SELECT COUNT(*) as total
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE u.is_active = TRUE
-        """
-        cur.execute(total_query)
-        total_result = cur.fetchone()
-        cur.close()
-        conn.close()
+        etag = make_etag("stats", *repo.tickets_version())
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        # Lectura de los contadores materializados (una fila por estado y categoría)
+        results = repo.ticket_counters()
+        by_status = {}
+        by_category = {}
+        for status, category, total in results:
+            by_status[status] = by_status.get(status, 0) + total
+            by_category[category] = by_category.get(category, 0) + total
         stats = {
-            'total_tickets': total_result[0],
-            'by_status': {row[0]: row[1] for row in status_results},
-            'by_category': {row[0]: row[1] for row in category_results},
+            'total_tickets': sum(by_status.values()),
+            'by_status': by_status,
+            'by_category': by_category,
         }
-        return jsonify({'success': True, 'stats': stats})
+        return cache_response("stats", 'stats', {'success': True, 'stats': stats}, etag)
     except mariadb.Error as e:
-        print(f"Error getting stats: {e}")
-        if conn:
-            conn.close()
+        logger.error("Error getting stats: %s", e)
         return jsonify({'error': 'Error al obtener estadísticas'}), 500
 
 @app.route('/api/tickets/user/<int:user_id>')
 def get_user_tickets(user_id):
-    if "user_id" not in session:
-        return jsonify({'error': 'No autenticado'}), 401
-    if session["user_id"] != user_id and session.get("role") != "admin":
-        return jsonify({'error': 'No autorizado'}), 403
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    forbidden = user_tickets_forbidden(user_id)
+    if forbidden:
+        return forbidden
+    return list_tickets({'user_id': user_id}, user_id=user_id)
+
+# Valores de ejemplo para revisar el plan de cada combinación de filtros
+EXPLAIN_SAMPLE_FILTERS = {
+    'status': ('pendiente',),
+    'category': ('infraestructura',),
+    'complaint_type': ('queja',),
+    'user_id': 1
+}
+
+@app.cli.command("explain-filters")
+def explain_filters_command():
+    """Ejecuta EXPLAIN del listado para cada combinación de filtros y falla si
+    alguna recorre la tabla complaints completa (tipo de acceso ALL).
+
+    Conviene ejecutarlo con un volumen de datos realista: con pocas filas el
+    optimizador puede preferir el recorrido completo aunque exista el índice.
+    """
+    today = datetime.now().date()
+    samples = {**EXPLAIN_SAMPLE_FILTERS, 'from': today - timedelta(days=30), 'to': today}
+    dimensions = ['status', 'category', 'complaint_type', 'user_id', 'date']
+    conn = db_pool.acquire()
+    full_scans = 0
     try:
-        cur = conn.cursor()
-        query = """
-            SELECT c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date,
-                   c.status, c.created_at, u.name, u.last_name, u.avatar_initials
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            WHERE c.user_id = ? AND u.is_active = TRUE
-            ORDER BY c.created_at DESC
-        """
-        cur.execute(query, (user_id,))
-        results = cur.fetchall()
-        category_names = {
-            'servicios-academicos': 'Servicios Académicos',
-            'infraestructura': 'Infraestructura',
-            'servicios-estudiantiles': 'Servicios Estudiantiles',
-            'tecnologia': 'Tecnología',
-            'administrativo': 'Administrativo',
-            'biblioteca': 'Biblioteca',
-            'cafeteria': 'Cafetería',
-            'otro': 'Otro'
-        }
-        tickets = []
-        for row in results:
-            ticket = {
-                'id': row[0],
-                'complaint_type': row[1],
-                'category': row[2],
-                'categoryName': category_names.get(row[2], row[2].title()),
-                'title': row[3],
-                'content': row[4],
-                'incident_date': row[5].strftime('%Y-%m-%d') if row[5] else None,
-                'status': row[6],
-                'date': row[7].strftime('%Y-%m-%d'),
-                'created_at': row[7].strftime('%Y-%m-%d %H:%M:%S'),
-                'user': {
-                    'name': row[8],
-                    'last_name': row[9],
-                    'initials': row[10] if row[10] else f"{row[8][0]}{row[9][0]}".upper()
-                }
-            }
-            tickets.append(ticket)
-        cur.close()
-        conn.close()
-        return jsonify({
-            'success': True,
-            'tickets': tickets,
-            'total': len(tickets),
-            'user_id': user_id
-        })
-    except mariadb.Error as e:
-        print(f"Error getting user tickets: {e}")
-        if conn:
-            conn.close()
-        return jsonify({'error': 'Error al obtener tickets del usuario'}), 500
+        repo = Repository(conn)
+        for size in range(len(dimensions) + 1):
+            for combination in itertools.combinations(dimensions, size):
+                names = [name for dimension in combination
+                         for name in (('from', 'to') if dimension == 'date' else (dimension,))]
+                filters = {name: samples[name] for name in names}
+                plan = repo.explain_tickets_list(filters, TICKETS_PAGE_SIZE + 1)
+                complaints_plan = next(row for row in plan if row['table'] == 'c')
+                full_scan = complaints_plan['type'] == 'ALL'
+                full_scans += full_scan
+                click.echo(f"{'✗' if full_scan else '✓'} {filters_key(filters):<70} "
+                           f"type={complaints_plan['type']} key={complaints_plan['key']} rows={complaints_plan['rows']}")
+    finally:
+        db_pool.release(conn)
+    if full_scans:
+        raise click.ClickException(f"{full_scans} combinaciones de filtros recorren complaints completa")
+    click.echo("Todas las combinaciones de filtros usan un índice")
 
 @app.route('/api/tickets/<int:ticket_id>/status', methods=['PUT'])
 def update_ticket_status(ticket_id):
@@ -398,30 +755,216 @@ def update_ticket_status(ticket_id):
     try:
         data = request.get_json()
         new_status = data.get('status', '').strip()
-        if new_status not in ['pendiente', 'en-proceso', 'resuelto', 'escalado']:
+        if new_status not in TICKET_STATUSES:
             return jsonify({'error': 'Estado no válido'}), 400
-        conn = get_db_connection()
-        if not conn:
+        repo = get_repository()
+        if not repo:
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        cur = conn.cursor()
-        cur.execute("UPDATE complaints SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (new_status, ticket_id))
-        if cur.rowcount == 0:
-            cur.close()
-            conn.close()
+        previous = repo.move_ticket_counter(ticket_id, new_status)
+        if previous is None:
+            repo.rollback()
             return jsonify({'error': 'Ticket no encontrado'}), 404
-        conn.commit()
-        cur.close()
-        conn.close()
+        repo.set_ticket_status(ticket_id, new_status)
+        repo.commit()
+        invalidate_ticket_caches(ticket_id)
+        ticket_events.publish('status-changed', {
+            'ticket_id': ticket_id,
+            'category': previous.category,
+            'old_status': previous.status,
+            'status': new_status
+        })
         return jsonify({
             'success': True,
             'message': 'Estado actualizado correctamente',
             'ticket_id': ticket_id,
             'new_status': new_status
         })
-    except Exception as e:
-        print(f"Error updating ticket status: {e}")
+    except Exception:
+        logger.exception("Error updating ticket status")
         return jsonify({'error': 'Error al actualizar el estado'}), 500
 
+# Cambios de estado en lote: máximo de tickets por petición
+BULK_MAX_TICKETS = 500
+
+def parse_resolution(data):
+    """Datos de resolución validados (formulario o JSON); lanza ValueError con el mensaje para el usuario"""
+    resolution = {
+        name: str(data.get(name) or "").strip()
+        for name in ("assigned_to", "admin_response", "status", "resolution_date")
+    }
+    if not all(resolution.values()):
+        raise ValueError("Completa todos los campos requeridos")
+    if resolution["status"] not in TICKET_STATUSES:
+        raise ValueError("Estado no válido")
+    time_spent = data.get("time_spent", "")
+    try:
+        time_spent = float(time_spent) if time_spent not in ("", None) else None
+    except (TypeError, ValueError):
+        raise ValueError("El tiempo invertido debe ser un número válido") from None
+    if time_spent is not None and (time_spent < 0 or time_spent > 99.99):
+        raise ValueError("El tiempo invertido debe estar entre 0 y 99.99 horas")
+    resolution["time_spent"] = time_spent
+    return resolution
+
+@app.route('/api/tickets/bulk', methods=['POST'])
+def bulk_update_tickets():
+    """Cambia el estado de varios tickets (y opcionalmente guarda la misma
+    resolución en todos) en una sola transacción.
+
+    Cuerpo JSON: {"ticket_ids": [...], "status": "...", "resolution": {...}}.
+    Devuelve el resultado de cada ticket; caché, contadores y eventos se
+    actualizan una vez por lote.
+    """
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({'error': 'No autorizado'}), 403
+    data = request.get_json(silent=True) or {}
+    ticket_ids = data.get('ticket_ids')
+    if not isinstance(ticket_ids, list) or not ticket_ids:
+        return jsonify({'error': 'ticket_ids debe ser una lista no vacía'}), 400
+    if len(ticket_ids) > BULK_MAX_TICKETS:
+        return jsonify({'error': f'Máximo {BULK_MAX_TICKETS} tickets por lote'}), 400
+    if not all(isinstance(ticket_id, int) and not isinstance(ticket_id, bool) for ticket_id in ticket_ids):
+        return jsonify({'error': 'ticket_ids debe contener solo enteros'}), 400
+    ticket_ids = sorted(set(ticket_ids))
+    new_status = str(data.get('status') or '').strip()
+    if new_status not in TICKET_STATUSES:
+        return jsonify({'error': 'Estado no válido'}), 400
+    resolution = None
+    if data.get('resolution') is not None:
+        if not isinstance(data['resolution'], dict):
+            return jsonify({'error': 'resolution debe ser un objeto'}), 400
+        try:
+            resolution = parse_resolution({**data['resolution'], 'status': new_status})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    repo = get_repository()
+    if not repo:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    try:
+        # Bloquea todos los tickets del lote de una vez (en orden de id)
+        found = repo.lock_tickets(ticket_ids)
+
+        counter_deltas = {}
+        changes = []
+        for ticket_id, (old_status, category) in found.items():
+            if old_status != new_status:
+                counter_deltas[(old_status, category)] = counter_deltas.get((old_status, category), 0) - 1
+                counter_deltas[(new_status, category)] = counter_deltas.get((new_status, category), 0) + 1
+            changes.append({
+                'ticket_id': ticket_id,
+                'category': category,
+                'old_status': old_status,
+                'status': new_status
+            })
+
+        if found:
+            repo.set_tickets_status(found, new_status)
+            deltas = [(status, category, delta) for (status, category), delta in counter_deltas.items() if delta]
+            if deltas:
+                repo.add_counter_deltas(deltas)
+            if resolution:
+                repo.save_responses(found, resolution)
+        repo.commit()
+    except mariadb.Error as e:
+        logger.error("Error updating tickets in bulk: %s", e)
+        repo.rollback()
+        return jsonify({'error': 'Error al actualizar los tickets'}), 500
+
+    if changes:
+        invalidate_ticket_caches(*found)
+        # Un solo evento por lote para no desbordar las colas de los paneles
+        ticket_events.publish('bulk-changed', {'changes': changes})
+    results = []
+    for ticket_id in ticket_ids:
+        if ticket_id in found:
+            results.append({'ticket_id': ticket_id, 'success': True, 'old_status': found[ticket_id].status})
+        else:
+            results.append({'ticket_id': ticket_id, 'success': False, 'error': 'Ticket no encontrado'})
+    return jsonify({
+        'success': True,
+        'status': new_status,
+        'updated': len(found),
+        'not_found': len(ticket_ids) - len(found),
+        'results': results
+    })
+
+# Importación masiva de quejas históricas (la CLI equivalente es flask --app flaskr import-tickets)
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+@app.route('/api/tickets/import', methods=['POST'])
+def import_tickets():
+    """Importa quejas desde un archivo CSV o JSONL subido en el campo "file".
+
+    Las filas se validan con las mismas reglas que /post y se insertan por
+    lotes; el tamaño del archivo está limitado por MAX_CONTENT_LENGTH, para
+    archivos grandes usar la CLI.
+    """
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({'error': 'No autorizado'}), 403
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Se requiere un archivo en el campo file'}), 400
+    fmt = request.args.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f'Formato no soportado: {fmt} (csv o jsonl)'}), 400
+    batch_size = max(1, request.args.get('batch_size', 1000, type=int))
+    commit_size = max(batch_size, request.args.get('commit_size', 10000, type=int))
+    repo = get_repository()
+    if not repo:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    report = ImportReport()
+    try:
+        import_complaints(repo, read_rows(upload.stream, fmt), batch_size, commit_size, report=report)
+    except (ValueError, csv.Error) as e:
+        # Archivo ilegible a mitad de la lectura (UnicodeDecodeError es un ValueError)
+        logger.warning("Archivo de importación no válido: %s", e)
+        imported_tickets_changed(report)
+        return jsonify({
+            'success': False, 'error': f'Archivo no válido: {e}', 'report': report.to_dict()
+        }), 400
+    except mariadb.Error as e:
+        logger.error("Error importing tickets: %s", e)
+        imported_tickets_changed(report)
+        return jsonify({'success': False, 'error': 'Error al importar los tickets', 'report': report.to_dict()}), 500
+    imported_tickets_changed(report)
+    return jsonify({'success': True, 'report': report.to_dict()})
+
+def imported_tickets_changed(report):
+    """Invalida las cachés si se confirmó alguna fila, aunque la importación fallara después"""
+    if report.inserted:
+        invalidate_ticket_caches()
+        # Los paneles recargan todo en lugar de recibir un evento por queja
+        ticket_events.publish('resync', {})
+
+@app.cli.command("import-tickets")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default=None, help="Por defecto, la extensión del archivo")
+@click.option("--batch-size", default=1000, type=int, help="Filas por executemany")
+@click.option("--commit-size", default=10000, type=int, help="Filas por transacción")
+def import_tickets_command(path, fmt, batch_size, commit_size):
+    """Importa quejas desde un CSV o JSONL; los rechazos se escriben como JSONL en stderr"""
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        raise click.ClickException(f"Formato no soportado: {fmt} (csv o jsonl)")
+    batch_size = max(1, batch_size)
+    report = ImportReport()
+
+    def on_reject(line, errors):
+        click.echo(dumps({'line': line, 'errors': errors}), err=True)
+
+    conn = db_pool.acquire()
+    try:
+        with open(path, 'rb') as stream:
+            import_complaints(Repository(conn), read_rows(stream, fmt), batch_size,
+                              max(batch_size, commit_size), on_reject, report)
+    except (ValueError, csv.Error, mariadb.Error) as e:
+        raise click.ClickException(f"Error importando {path}: {e}")
+    finally:
+        db_pool.release(conn)
+        click.echo(f"Filas: {report.rows} | insertadas: {report.inserted} | rechazadas: {report.rejected} | "
+                   f"{report.elapsed:.1f}s ({report.rows_per_second:.0f} filas/s)")
+
 @app.route("/api/tickets/<int:ticket_id>/resolve", methods=["POST"])
 def resolve_ticket(ticket_id):
     """
@@ -431,26 +974,12 @@ def resolve_ticket(ticket_id):
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
     # Procesar datos de formulario (soporta FormData)
-    form = request.form
-    files = request.files
-    assigned_to = form.get("assigned_to", "").strip()
-    admin_response = form.get("admin_response", "").strip()
-    status = form.get("status", "").strip()
-    resolution_date = form.get("resolution_date", "").strip()
-    time_spent = form.get("time_spent", "")
-    proof_image = files.get("proof_image")
-
-    # Validaciones
-    required_fields = [assigned_to, admin_response, status, resolution_date]
-    if not all(required_fields):
-        return jsonify({"success": False, "message": "Completa todos los campos requeridos"}), 400
-
     try:
-        time_spent = float(time_spent) if time_spent not in ("", None) else None
-        if time_spent is not None and (time_spent < 0 or time_spent > 99.99):
-            return jsonify({"success": False, "message": "El tiempo invertido debe estar entre 0 y 99.99 horas"}), 400
-    except ValueError:
-        return jsonify({"success": False, "message": "El tiempo invertido debe ser un número válido"}), 400
+        resolution = parse_resolution(request.form)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    status = resolution["status"]
+    proof_image = request.files.get("proof_image")
 
     # Procesar imagen de comprobante
     proof_info = None
@@ -461,119 +990,63 @@ def resolve_ticket(ticket_id):
         file_ext = filename.rsplit(".", 1)[-1].lower()
         if file_ext not in allowed_extensions or proof_image.content_type not in allowed_mime_types:
             return jsonify({"success": False, "message": "Formato de imagen no permitido: JPG, JPEG, PNG, GIF"}), 400
-        proof_image.seek(0, os.SEEK_END)
-        file_size = proof_image.tell()
-        proof_image.seek(0)
-        if file_size > 5 * 1024 * 1024:
-            return jsonify({"success": False, "message": "La imagen de comprobante debe ser menor a 5MB"}), 400
-
-        # Guardar imagen
-        upload_dir = os.path.join(app.static_folder or os.path.dirname(os.path.abspath(__file__)), "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-        user_email = session["email"].split("@")[0]
-        user_id = session["user_id"]
-        timestamp = int(time.time())
-        unique_filename = f"resolution_{user_email}_{user_id}_{ticket_id}_{timestamp}.{file_ext}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        proof_image.save(file_path)
-
-        # Opcional: procesar imagen
+
+        # Guardar imagen en el almacén de blobs en una sola pasada (tamaño, hash y tipo real)
         try:
-            with Image.open(file_path) as img:
-                max_width, max_height = 1920, 1080
-                if img.width > max_width or img.height > max_height:
-                    img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                img.save(file_path)
-        except Exception as e:
-            print(f"Procesamiento de imagen fallido: {e}")
+            sha256, file_path, file_size = blob_store.put(proof_image.stream, file_ext, max_size=5 * 1024 * 1024)
+        except UploadRejected as e:
+            return jsonify({"success": False, "message": f"Imagen de comprobante no válida: {e}"}), 400
 
+        # La optimización se hace en segundo plano después del commit
         proof_info = {
-            "saved_name": unique_filename,
-            "file_path": f"uploads/{unique_filename}",
+            "sha256": sha256,
+            "abs_path": file_path,
             "file_type": file_ext,
             "file_size": file_size
         }
 
-    # Guardar resolución en la base de datos
-    conn = get_db_connection()
-    if not conn:
-        # Eliminar imagen si no se pudo conectar a BD
-        if proof_info and os.path.exists(os.path.join(app.static_folder, proof_info["file_path"])):
-            os.remove(os.path.join(app.static_folder, proof_info["file_path"]))
+    # Guardar resolución en la base de datos. Si algo falla, el blob queda sin
+    # referencias y lo borra el GC (flask gc-blobs); otra subida podría compartirlo.
+    repo = get_repository()
+    if not repo:
         return jsonify({"success": False, "message": "Error de conexión a la base de datos"}), 500
 
     try:
-        cur = conn.cursor()
-        cur.execute("UPDATE complaints SET status = ? WHERE id = ?", (status, ticket_id))
-        cur.execute("SELECT id FROM complaint_responses WHERE complaint_id = ?", (ticket_id,))
-        existing_response = cur.fetchone()
-
-        # Crear tabla de imágenes de resolución si no existe
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS resolution_images (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                complaint_id INT NOT NULL,
-                saved_filename VARCHAR(255) NOT NULL,
-                file_path VARCHAR(500) NOT NULL,
-                file_type VARCHAR(10) NOT NULL,
-                file_size INT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (complaint_id) REFERENCES complaints(id) ON DELETE CASCADE
-            );
-        """)
-
-        if existing_response:
-            update_response = """
-                UPDATE complaint_responses 
-                SET assigned_to = ?, admin_response = ?, resolution_date = ?, time_spent = ?
-                WHERE complaint_id = ?
-            """
-            cur.execute(update_response, (
-                assigned_to,
-                admin_response,
-                resolution_date,
-                time_spent,
-                ticket_id
-            ))
-        else:
-            insert_response = """
-                INSERT INTO complaint_responses (
-                    complaint_id, assigned_to, admin_response, resolution_date, time_spent
-                ) VALUES (?, ?, ?, ?, ?)
-            """
-            cur.execute(insert_response, (
-                ticket_id,
-                assigned_to,
-                admin_response,
-                resolution_date,
-                time_spent
-            ))
+        # Una sola transacción: el ticket queda bloqueado desde la primera
+        # sentencia, así que dos admins que resuelven a la vez se serializan y
+        # el segundo parte del estado que dejó el primero
+        previous = repo.move_ticket_counter(ticket_id, status)
+        if previous is None:
+            repo.rollback()
+            return jsonify({"success": False, "message": "Ticket no encontrado"}), 404
+        repo.set_ticket_status(ticket_id, status)
+        repo.save_response(ticket_id, resolution)
 
         # Guardar la imagen de comprobante si existe
         if proof_info:
-            insert_img = """
-                INSERT INTO resolution_images (
-                    complaint_id, saved_filename, file_path, file_type, file_size
-                ) VALUES (?, ?, ?, ?, ?)
-            """
-            cur.execute(insert_img, (
-                ticket_id,
-                proof_info["saved_name"],
-                proof_info["file_path"],
-                proof_info["file_type"],
-                proof_info["file_size"]
-            ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
+            blob, proof_info["created"] = repo.register_blob(
+                proof_info["sha256"], upload_relative_path(proof_info["abs_path"]),
+                proof_info["file_type"], proof_info["file_size"]
+            )
+            proof_info["blob"] = blob
+            repo.add_resolution_image(ticket_id, os.path.basename(blob.file_path), blob)
+
+        repo.commit()
+        invalidate_ticket_caches(ticket_id)
+        ticket_events.publish('resolved', {
+            'ticket_id': ticket_id,
+            'category': previous.category,
+            'old_status': previous.status,
+            'status': status,
+            'admin_image': listing_image(proof_info["blob"]) if proof_info else None
+        })
+        # Solo se procesa una imagen nueva; un blob ya conocido reutiliza sus derivados
+        if proof_info and proof_info["created"] and proof_info["blob"].processing_status == 'pending':
+            schedule_image_optimization(proof_info["blob"])
         return jsonify({"success": True, "message": "Ticket resuelto exitosamente"})
     except mariadb.Error as e:
-        print(f"Error resolviendo ticket: {e}")
-        if conn: conn.rollback()
-        # Eliminar imagen si hay error de BD
-        if proof_info and os.path.exists(os.path.join(app.static_folder, proof_info["file_path"])):
-            os.remove(os.path.join(app.static_folder, proof_info["file_path"]))
+        logger.error("Error resolviendo ticket: %s", e)
+        repo.rollback()
         return jsonify({"success": False, "message": "Database error"}), 500
 # ========== FIN DE TICKETS ==========
 
@@ -584,10 +1057,9 @@ def profile():
         return redirect(url_for("auth"))
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({"success": False, "message": "Error de conexión con base de datos"}), 500
-    cur = conn.cursor()
 
     if request.method == "POST":
         data = request.get_json()
@@ -601,17 +1073,12 @@ def profile():
         initials = f"{name[0]}{last_name[0]}".upper() if name and last_name else ""
 
         try:
-            cur.execute("""
-                UPDATE users SET
-                    name = ?, last_name = ?, email = ?, 
-                    study_area = ?, study_speciality = ?, 
-                    term = ?, personal_description = ?, 
-                    avatar_initials = ?
-                WHERE id = ?
-            """, (name, last_name, email, study_area, study_speciality, term, personal_description, initials, user_id))
-            conn.commit()
-            cur.close()
-            conn.close()
+            repo.update_profile(user_id, Profile(
+                name, last_name, email, study_area, study_speciality, term, personal_description
+            ), initials)
+            repo.commit()
+            # Nombre e iniciales aparecen en listados y detalles
+            response_cache.invalidate("tickets:", "ticket:")
 
             session["name"] = name
             session["last_name"] = last_name
@@ -624,20 +1091,11 @@ def profile():
         except mariadb.Error as e:
             return jsonify({"success": False, "message": f"Error al actualizar: {e}"})
 
-    cur.execute("SELECT name, last_name, email, study_area, study_speciality, term, personal_description FROM users WHERE id = ?", (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    row = repo.profile(user_id)
 
     user_data = {
-        "name": row[0],
-        "last_name": row[1],
-        "email": row[2],
-        "study_area": row[3],
-        "study_speciality": row[4],
-        "term": row[5],
-        "personal_description": row[6],
-        "initials": f"{row[0][0]}{row[1][0]}".upper() if row[0] and row[1] else ""
+        **row._asdict(),
+        "initials": f"{row.name[0]}{row.last_name[0]}".upper() if row.name and row.last_name else ""
     }
 
     return render_template("profile.html", user=user_data)
@@ -649,57 +1107,24 @@ def post():
         return redirect(url_for("auth"))
 
     if request.method == "POST":
-        print("="*50)
-        print("INICIANDO PROCESAMIENTO POST")
-        print("="*50)
         try:
             # Manejar datos del formulario
             data = request.form
             files = request.files.getlist('files')
             
-            print(f"Datos recibidos: {dict(data)}")
-            print(f"Archivos recibidos: {len(files)}")
-            
-            # Debug detallado de archivos sin consumir su contenido
-            for i, file in enumerate(files):
-                # Guardar posición actual
-                current_pos = file.tell()
-                
-                # Obtener tamaño sin consumir contenido
-                file.seek(0, os.SEEK_END)
-                file_size = file.tell()
-                file.seek(current_pos)  # Volver a posición original
-                
-                print(f"Archivo {i}: nombre='{file.filename}', tipo='{file.content_type}', tamaño={file_size} bytes")
-
-            complaint_type = data.get("complaint_type", "").strip()
-            category = data.get("category", "").strip()
-            subject = data.get("subject", "").strip()
-            description = data.get("description", "").strip()
-            incident_date = data.get("incident_date")
-
-            # Validaciones
-            errors = []
-            if not complaint_type:
-                errors.append("El tipo de solicitud es requerido")
-            if not category:
-                errors.append("La categoría es requerida")
-            if not subject or len(subject) < 5:
-                errors.append("El asunto es requerido (mínimo 5 caracteres)")
-            if not description or len(description) < 20:
-                errors.append("La descripción es requerida (mínimo 20 caracteres)")
-
-            # Validar valores permitidos
-            valid_types = ['queja', 'sugerencia', 'peticion']
-            if complaint_type not in valid_types:
-                errors.append("Tipo de solicitud no válido")
-
-            valid_categories = [
-                'servicios-academicos', 'infraestructura', 'servicios-estudiantiles',
-                'tecnologia', 'administrativo', 'biblioteca', 'cafeteria', 'otro'
-            ]
-            if category not in valid_categories:
-                errors.append("Categoría no válida")
+            # Solo nombres de campos y tipos: el contenido de la queja no va al log
+            logger.debug("Alta de queja recibida", extra={
+                'fields': sorted(data.keys()),
+                'files': [file.content_type for file in files]
+            })
+
+            # Validaciones (las mismas que aplica la importación masiva)
+            values, errors = clean_complaint(data)
+            complaint_type = values["complaint_type"]
+            category = values["category"]
+            subject = values["subject"]
+            description = values["description"]
+            incident_date = values["incident_date"]
 
             if errors:
                 return jsonify({
@@ -709,38 +1134,8 @@ def post():
                 }), 400
 
             # Procesar archivos adjuntos
-            print("INICIANDO PROCESAMIENTO DE ARCHIVOS")
             uploaded_files = []
             if files and any(f.filename for f in files):  # Verificar que hay archivos válidos
-                print(f"Hay archivos para procesar: {[f.filename for f in files if f.filename]}")
-                
-                # Crear directorio uploads de forma más robusta
-                if app.static_folder:
-                    upload_dir = os.path.join(app.static_folder, 'uploads')
-                else:
-                    # Fallback si static_folder no está configurado
-                    upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
-                
-                print(f"Directorio de destino: {upload_dir}")
-                
-                # Asegurarse de que el directorio existe
-                try:
-                    os.makedirs(upload_dir, exist_ok=True)
-                    print(f"Directorio creado/verificado: {upload_dir}")
-                    
-                    # Verificar permisos de escritura
-                    test_file = os.path.join(upload_dir, 'test_permission.txt')
-                    with open(test_file, 'w') as f:
-                        f.write('test')
-                    os.remove(test_file)
-                    print("✓ Permisos de escritura verificados")
-                except OSError as e:
-                    print(f"ERROR CRÍTICO creando directorio: {e}")
-                    return jsonify({
-                        "success": False,
-                        "message": f"Error configurando directorio de archivos: {str(e)}"
-                    }), 500
-
                 # Configuración actualizada para permitir más tipos de archivo
                 max_files = 5
                 max_file_size = 10 * 1024 * 1024  # 10MB
@@ -771,245 +1166,118 @@ def post():
                         "message": f"Máximo {max_files} archivos permitidos"
                     }), 400
 
-                for i, file in enumerate(valid_files):
-                    print(f"\n--- PROCESANDO ARCHIVO {i+1}/{len(valid_files)} ---")
-                    print(f"Nombre: {file.filename}")
-                    print(f"Tipo MIME: {file.content_type}")
-                    
+                for file in valid_files:
                     # Validar nombre de archivo
                     if not file.filename:
-                        print("Saltando archivo sin nombre")
                         continue
                         
                     filename = secure_filename(file.filename)
                     if not filename:
-                        print("Saltando archivo con nombre inseguro")
+                        logger.debug("Archivo con nombre inseguro omitido")
                         continue
-                    
-                    print(f"Nombre seguro: {filename}")
                         
                     # Validar extensión
                     if '.' not in filename:
                         error_msg = f"Archivo sin extensión: {file.filename}"
-                        print(f"ERROR: {error_msg}")
+                        logger.info("Adjunto rechazado: sin extensión")
                         return jsonify({
                             "success": False,
                             "message": error_msg
                         }), 400
                         
                     file_ext = filename.rsplit('.', 1)[1].lower()
-                    print(f"Extensión detectada: {file_ext}")
                     
                     # Validación dual: extensión Y tipo MIME
                     if file_ext not in allowed_extensions:
                         error_msg = f"Extensión de archivo no permitida: {filename}. Permitidas: {', '.join(sorted(allowed_extensions))}"
-                        print(f"ERROR: {error_msg}")
+                        logger.info("Adjunto rechazado: extensión no permitida", extra={'file_ext': file_ext})
                         return jsonify({
                             "success": False,
                             "message": error_msg
                         }), 400
                     
                     if file.content_type and file.content_type not in allowed_mime_types:
-                        print(f"Advertencia: Tipo MIME no reconocido: {file.content_type} para archivo {filename}")
+                        logger.debug("Tipo MIME no reconocido", extra={'content_type': file.content_type, 'file_ext': file_ext})
                         # No bloqueamos por MIME type, solo advertimos
 
-                    # Validar tamaño del archivo
-                    current_pos = file.tell()
-                    file.seek(0, os.SEEK_END)
-                    file_size = file.tell()
-                    file.seek(current_pos)  # Volver a posición original
-                    print(f"Tamaño del archivo: {file_size} bytes ({file_size / 1024 / 1024:.2f} MB)")
-
-                    if file_size == 0:
-                        error_msg = f"Archivo vacío: {filename}"
-                        print(f"ERROR: {error_msg}")
-                        return jsonify({
-                            "success": False,
-                            "message": error_msg
-                        }), 400
-
-                    if file_size > max_file_size:
-                        error_msg = f"Archivo muy grande: {filename} ({file_size / 1024 / 1024:.1f}MB). Máximo 10MB."
-                        print(f"ERROR: {error_msg}")
-                        return jsonify({
-                            "success": False,
-                            "message": error_msg
-                        }), 400
-
-                    # Generar nombre único
-                    user_email = session['email'].split('@')[0]
-                    user_db_id = session['user_id']  # ID de la BD
-                    timestamp = int(time.time())  # Agregar timestamp para mayor unicidad
-                    
-                    # Mantener la extensión original
-                    unique_filename = f"{user_email}_{user_db_id}_{timestamp}_{i+1}.{file_ext}"
-                    file_path = os.path.join(upload_dir, unique_filename)
-                    
-                    print(f"Nombre único generado: {unique_filename}")
-                    print(f"Ruta completa: {file_path}")
-
                     try:
-                        print("Intentando guardar archivo...")
-                        # Guardar archivo
-                        file.save(file_path)
-                        print(f"✓ Archivo guardado exitosamente")
-                        
-                        # Verificar que realmente se guardó
-                        if os.path.exists(file_path):
-                            actual_size = os.path.getsize(file_path)
-                            print(f"✓ Archivo verificado en disco, tamaño: {actual_size} bytes")
-                            
-                            # Verificar integridad del archivo
-                            if actual_size != file_size:
-                                print(f"Advertencia: Tamaño esperado {file_size} vs tamaño actual {actual_size}")
-                        else:
-                            raise Exception("El archivo no se encontró después de guardar")
-
-                        # Solo procesar imágenes con PIL
-                        if file_ext in ['jpg', 'jpeg', 'png', 'gif']:
-                            print("Procesando como imagen...")
-                            try:
-                                # Procesar y optimizar imagen con PIL
-                                with Image.open(file_path) as img:
-                                    print(f"Imagen abierta: {img.size}, modo: {img.mode}")
-                                    
-                                    # Convertir a RGB si es necesario (para JPEGs)
-                                    if file_ext in ['jpg', 'jpeg'] and img.mode in ('RGBA', 'P', 'L'):
-                                        print("Convirtiendo imagen a RGB")
-                                        img = img.convert('RGB')
-
-                                    # Redimensionar si es muy grande
-                                    max_width, max_height = 1920, 1080
-                                    if img.width > max_width or img.height > max_height:
-                                        original_size = img.size
-                                        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                                        print(f"Imagen redimensionada de {original_size} a {img.size}")
-
-                                    # Guardar imagen optimizada
-                                    if file_ext in ['jpg', 'jpeg']:
-                                        img.save(file_path, 'JPEG', quality=85, optimize=True)
-                                    elif file_ext == 'png':
-                                        img.save(file_path, 'PNG', optimize=True)
-                                    elif file_ext == 'gif':
-                                        img.save(file_path, 'GIF', optimize=True)
-                                    
-                                    print("✓ Imagen optimizada y guardada")
-                            except Exception as img_error:
-                                print(f"Advertencia procesando imagen {filename}: {str(img_error)}")
-                                # Si falla el procesamiento de imagen, continuar con el archivo original
-                                pass
-                        else:
-                            print("Archivo guardado sin procesamiento (no es imagen)")
-
-                        # Actualizar tamaño después de procesamiento
-                        final_size = os.path.getsize(file_path)
+                        # Ingesta en una sola pasada: tamaño, hash, tipo real y límite
+                        # se comprueban mientras se escribe; el mismo contenido se guarda una sola vez
+                        sha256, file_path, stored_size = blob_store.put(file.stream, file_ext, max_size=max_file_size)
+                        logger.debug("Adjunto guardado", extra={'sha256': sha256, 'size': stored_size, 'file_ext': file_ext})
+
+                        # Las imágenes nuevas se optimizan en segundo plano después del commit
                         file_info = {
                             'original_name': file.filename,
-                            'saved_name': unique_filename,
-                            'path': f'uploads/{unique_filename}',
-                            'size': final_size,
+                            'sha256': sha256,
+                            'abs_path': file_path,
+                            'size': stored_size,
                             'type': file_ext
                         }
                         uploaded_files.append(file_info)
-                        print(f"✓ Archivo agregado a la lista: {file_info}")
 
+                    except UploadRejected as e:
+                        error_msg = f"{e}: {filename}"
+                        logger.info("Adjunto rechazado: %s", e, extra={'file_ext': file_ext})
+                        return jsonify({
+                            "success": False,
+                            "message": error_msg
+                        }), 400
                     except Exception as e:
                         error_msg = f"Error procesando archivo {filename}: {str(e)}"
-                        print(f"ERROR CRÍTICO: {error_msg}")
-                        import traceback
-                        traceback.print_exc()
-                        
-                        # Limpiar archivo temporal si existe
-                        if os.path.exists(file_path):
-                            try:
-                                os.remove(file_path)
-                                print(f"Archivo temporal eliminado: {file_path}")
-                            except:
-                                print("Error eliminando archivo temporal")
-                        
+                        logger.exception("Error procesando adjunto", extra={'file_ext': file_ext})
+
                         return jsonify({
                             "success": False,
                             "message": error_msg
                         }), 400
-                        
-                print(f"\n✓ PROCESAMIENTO DE ARCHIVOS COMPLETADO")
-                print(f"Total archivos procesados: {len(uploaded_files)}")
-            else:
-                print("No hay archivos para procesar o todos están vacíos")
-
-            # Conectar a la base de datos
-            conn = get_db_connection()
-            if not conn:
-                # Limpiar archivos subidos si hay error de conexión
-                cleanup_uploaded_files(uploaded_files)
+
+
+            # Conectar a la base de datos. Si algo falla, los blobs quedan sin
+            # referencias y los borra el GC (flask gc-blobs)
+            repo = get_repository()
+            if not repo:
                 return jsonify({
                     "success": False,
                     "message": "Error de conexión a la base de datos"
                 }), 500
 
             try:
-                cur = conn.cursor()
-                
                 # Insertar queja principal
-                query = """
-                    INSERT INTO complaints (
-                        user_id, complaint_type, category,
-                        subject, description, incident_date, status
-                    ) VALUES (?, ?, ?, ?, ?, ?, 'pendiente')
-                """
-
-                cur.execute(query, (
+                complaint_id = repo.create_complaint(
                     session["user_id"],
                     complaint_type,
                     category,
                     subject,
                     description,
                     incident_date if incident_date and incident_date.strip() else None
-                ))
-
-                complaint_id = cur.lastrowid
-                print(f"Queja creada con ID: {complaint_id}")
+                )
+                repo.increment_ticket_counter('pendiente', category)
 
                 # Guardar archivos adjuntos si los hay
                 if uploaded_files:
-                    # Crear tabla de adjuntos si no existe
-                    create_attachments_table = """
-                        CREATE TABLE IF NOT EXISTS complaint_attachments (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            complaint_id INT NOT NULL,
-                            original_filename VARCHAR(255) NOT NULL,
-                            saved_filename VARCHAR(255) NOT NULL,
-                            file_path VARCHAR(500) NOT NULL,
-                            file_size INT NOT NULL,
-                            file_type VARCHAR(10) NOT NULL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            FOREIGN KEY (complaint_id) REFERENCES complaints(id) ON DELETE CASCADE
-                        );
-                    """
-                    cur.execute(create_attachments_table)
-                    print("Tabla de adjuntos verificada/creada")
-
                     # Insertar cada archivo adjunto
                     for file_info in uploaded_files:
-                        attachment_query = """
-                            INSERT INTO complaint_attachments (
-                                complaint_id, original_filename, saved_filename, 
-                                file_path, file_size, file_type
-                            ) VALUES (?, ?, ?, ?, ?, ?)
-                        """
-                        cur.execute(attachment_query, (
-                            complaint_id,
-                            file_info['original_name'],
-                            file_info['saved_name'],
-                            file_info['path'],
-                            file_info['size'],
-                            file_info['type']
-                        ))
-                    print(f"Guardados {len(uploaded_files)} archivos adjuntos")
-
-                conn.commit()
-                cur.close()
-                conn.close()
+                        blob, file_info['created'] = repo.register_blob(
+                            file_info['sha256'], upload_relative_path(file_info['abs_path']),
+                            file_info['type'], file_info['size']
+                        )
+                        file_info['blob'] = blob
+                        repo.add_attachment(complaint_id, file_info['original_name'],
+                                            os.path.basename(blob.file_path), blob)
+
+                repo.commit()
+                logger.debug("Queja creada", extra={'ticket_id': complaint_id, 'attachments': len(uploaded_files)})
+                invalidate_ticket_caches()
+                ticket_events.publish('created', {
+                    'ticket_id': complaint_id,
+                    'category': category,
+                    'status': 'pendiente'
+                })
+                # Solo se procesan imágenes nuevas; un blob ya conocido reutiliza sus derivados
+                for file_info in uploaded_files:
+                    if file_info['created'] and file_info['blob'].processing_status == 'pending':
+                        schedule_image_optimization(file_info['blob'])
 
                 # Mensaje de éxito
                 success_message = "¡Solicitud enviada correctamente! Te contactaremos pronto."
@@ -1023,23 +1291,16 @@ def post():
                     "uploaded_files": len(uploaded_files)
                 }), 201
 
-            except mariadb.Error as e:
-                print(f"Error de base de datos: {e}")
-                import traceback
-                traceback.print_exc()
-                
-                # Limpiar archivos subidos si hay error en BD
-                cleanup_uploaded_files(uploaded_files)
+            except mariadb.Error:
+                logger.exception("Error de base de datos al crear la queja")
                 
                 return jsonify({
                     "success": False,
                     "message": "Error al guardar la solicitud en la base de datos"
                 }), 500
 
-        except Exception as e:
-            print(f"Error general en post: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error general en post")
             
             return jsonify({
                 "success": False,
@@ -1056,121 +1317,40 @@ def post():
 
     return render_template("post.html", user=user_data)
 
-def cleanup_uploaded_files(uploaded_files):
-    """Limpia archivos subidos en caso de error"""
-    for file_info in uploaded_files:
-        try:
-            if app.static_folder:
-                file_path = os.path.join(app.static_folder, file_info['path'])
-            else:
-                file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', file_info['path'])
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"Archivo limpiado: {file_path}")
-        except Exception as e:
-            print(f"Error limpiando archivo: {e}")
-
-
 @app.route("/ticket/<int:ticket_id>")
 def ticket_detail(ticket_id):
-    print("Entrando a ticket_detail, ticket_id:", ticket_id)
-    print("Session actual:", dict(session))
-    
     # Verifica autenticación
     if "user_id" not in session:
-        print("No autenticado, redirigiendo a /auth")
         return redirect(url_for("auth"))
 
     # Verifica rol de admin
     if session.get("role") != "admin":
-        print("No es admin, redirigiendo a /auth")
+        logger.info("Acceso no autorizado al detalle", extra={'ticket_id': ticket_id, 'user_id': session["user_id"]})
         flash("Acceso no autorizado", "error")
         return redirect(url_for("auth"))
     
-    conn = get_db_connection()
-    if not conn:
-        print("No conecta a la base de datos, redirigiendo a /ticket")
+    repo = get_repository()
+    if not repo:
         flash("Error de conexión a la base de datos", "error")
         return redirect(url_for("ticket_validation"))
     
     try:
-        cur = conn.cursor()
-        # Elimina columnas no presentes en la tabla complaint_responses
-        query = """
-            SELECT 
-                c.id, c.complaint_type, c.category, c.subject, 
-                c.description, c.incident_date, c.status, c.created_at,
-                u.name, u.last_name, u.email, u.study_area, u.term,
-                cr.assigned_to, cr.admin_response, cr.resolution_date,
-                cr.time_spent
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            LEFT JOIN complaint_responses cr ON c.id = cr.complaint_id
-            WHERE c.id = ?
-        """
-        cur.execute(query, (ticket_id,))
-        result = cur.fetchone()
-        print("Resultado SQL:", result)
+        result = repo.ticket_detail(ticket_id)
         
         if not result:
-            print("Ticket no encontrado, redirigiendo a /ticket")
             flash("Ticket no encontrado", "error")
             return redirect(url_for("ticket_validation"))
         
-        category_names = {
-            'servicios-academicos': 'Servicios Académicos',
-            'infraestructura': 'Infraestructura',
-            'servicios-estudiantiles': 'Servicios Estudiantiles',
-            'tecnologia': 'Tecnología',
-            'administrativo': 'Administrativo',
-            'biblioteca': 'Biblioteca',
-            'cafeteria': 'Cafetería',
-            'otro': 'Otro'
-        }
-        
-        def safe_date_format(date_value):
-            if date_value and not isinstance(date_value, str):
-                return date_value.strftime('%Y-%m-%d')
-            return date_value
-        
-        ticket_data = {
-            'id': result[0],
-            'complaint_type': result[1],
-            'category': result[2],
-            'categoryName': category_names.get(result[2], result[2].title()),
-            'subject': result[3],
-            'description': result[4],
-            'incident_date': safe_date_format(result[5]),
-            'status': result[6],
-            'created_at': result[7].strftime('%Y-%m-%d %H:%M:%S') if result[7] else "",
-            'user': {
-                'name': result[8],
-                'last_name': result[9],
-                'email': result[10],
-                'study_area': result[11],
-                'term': result[12]
-            },
-            'response': {
-                'assigned_to': result[13],
-                'admin_response': result[14],
-                'resolution_date': safe_date_format(result[15]),
-                'time_spent': float(result[16]) if result[16] is not None else None
-            }
-        }
-        
-        cur.close()
-        conn.close()
-        
-        print("Renderizando ticket_resolution.html con ticket_data:", ticket_data)
+        ticket_data = result.to_dict()
+        logger.debug("Detalle de ticket", extra={'ticket_id': ticket_id, 'status': ticket_data['status']})
         return render_template("ticket_resolution.html", ticket=ticket_data)
         
     except mariadb.Error as e:
-        print(f"Error de MariaDB al obtener los datos del ticket: {e}")
+        logger.error("Error de MariaDB al obtener los datos del ticket: %s", e, extra={'ticket_id': ticket_id})
         flash("Error al obtener los datos del ticket", "error")
         return redirect(url_for("ticket_validation"))
-    except Exception as e:
-        print(f"Error inesperado al procesar el ticket: {e}")
+    except Exception:
+        logger.exception("Error inesperado al procesar el ticket", extra={'ticket_id': ticket_id})
         flash("Error inesperado al procesar el ticket", "error")
         return redirect(url_for("ticket_validation"))
 
@@ -1180,94 +1360,125 @@ def api_ticket_detail(ticket_id):
     if "user_id" not in session or session.get("role") != "admin":
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    conn = get_db_connection()
-    if not conn:
+    cache_key = f"ticket:{ticket_id}:"
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+
+    repo = get_repository()
+    if not repo:
         return jsonify({"success": False, "message": "Error de conexión a la base de datos"}), 500
 
     try:
-        cur = conn.cursor()
-        # Ticket básico y respuesta admin
-        query = """
-            SELECT c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date, c.status, c.created_at,
-                   u.name, u.last_name, u.email, u.study_area, u.term,
-                   cr.assigned_to, cr.admin_response, cr.resolution_date, cr.time_spent
-            FROM complaints c
-            INNER JOIN users u ON c.user_id = u.id
-            LEFT JOIN complaint_responses cr ON c.id = cr.complaint_id
-            WHERE c.id = ?
-        """
-        cur.execute(query, (ticket_id,))
-        result = cur.fetchone()
+        etag = make_etag(cache_key, *repo.ticket_version(ticket_id))
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        # Ticket básico, respuesta admin e imágenes medianas
+        result = repo.ticket_detail(ticket_id, images=True)
         if not result:
             return jsonify({"success": False, "message": "Ticket not found"}), 404
 
-        # Obtener imagen del usuario (primer imagen en complaint_attachments)
-        cur.execute("""
-            SELECT file_path FROM complaint_attachments 
-            WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-            ORDER BY id ASC LIMIT 1
-        """, (ticket_id,))
-        user_img_row = cur.fetchone()
-        user_image = user_img_row[0] if user_img_row else ""
-
-        # Obtener imagen de resolución (primer imagen en resolution_images)
-        cur.execute("""
-            SELECT file_path FROM resolution_images
-            WHERE complaint_id = ? AND file_type IN ('jpg','jpeg','png','gif')
-            ORDER BY id ASC LIMIT 1
-        """, (ticket_id,))
-        admin_img_row = cur.fetchone()
-        admin_image = admin_img_row[0] if admin_img_row else ""
-
-        category_names = {
-            'servicios-academicos': 'Servicios Académicos',
-            'infraestructura': 'Infraestructura',
-            'servicios-estudiantiles': 'Servicios Estudiantiles',
-            'tecnologia': 'Tecnología',
-            'administrativo': 'Administrativo',
-            'biblioteca': 'Biblioteca',
-            'cafeteria': 'Cafetería',
-            'otro': 'Otro'
-        }
-        def safe_date_format(date_value):
-            return date_value.strftime('%Y-%m-%d') if date_value and not isinstance(date_value, str) else date_value
-
-        ticket_data = {
-            'success': True,
-            'ticket': {
-                'id': result[0],
-                'complaint_type': result[1],
-                'category': result[2],
-                'categoryName': category_names.get(result[2], result[2].title()),
-                'subject': result[3],
-                'description': result[4],
-                'incident_date': safe_date_format(result[5]),
-                'status': result[6],
-                'created_at': result[7].strftime('%Y-%m-%d %H:%M:%S'),
-                'user': {
-                    'name': result[8],
-                    'last_name': result[9],
-                    'email': result[10],
-                    'study_area': result[11],
-                    'term': result[12]
-                },
-                'response': {
-                    'assigned_to': result[13],
-                    'admin_response': result[14],
-                    'resolution_date': safe_date_format(result[15]),
-                    'time_spent': float(result[16]) if result[16] is not None else None
-                },
-                'user_image': user_image,
-                'admin_image': admin_image
-            }
-        }
-        cur.close()
-        conn.close()
-        return jsonify(ticket_data)
+        ticket_data = {'success': True, 'ticket': result.to_dict()}
+        return cache_response(cache_key, 'ticket', ticket_data, etag)
     except mariadb.Error as e:
-        print(f"API Error getting ticket detail: {e}")
+        logger.error("API Error getting ticket detail: %s", e)
         return jsonify({"success": False, "message": "Database error"}), 500
 
+@app.route("/api/db/pool")
+def db_pool_stats():
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return jsonify({"success": True, "pool": db_pool.stats()})
+
+@app.route("/api/db/queries")
+def db_query_stats():
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    if request.args.get("reset"):
+        query_stats.reset()
+    return jsonify({"success": True, "queries": query_stats.snapshot()})
+
+def collect_runtime_metrics():
+    """Valores del pool, la caché y el SSE leídos en el momento de la consulta"""
+    pool = db_pool.stats()
+    cache = response_cache.stats()
+    return [
+        ('db_pool_connections', 'gauge', "Conexiones del pool por estado",
+         [({'state': 'in_use'}, pool['in_use']), ({'state': 'idle'}, pool['idle'])]),
+        ('db_pool_checkout_failures_total', 'counter', "Conexiones que no se pudieron prestar",
+         [({}, pool['checkout_failures'])]),
+        ('response_cache_requests_total', 'counter', "Consultas a la caché de respuestas",
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('response_cache_entries', 'gauge', "Entradas en la caché de respuestas", [({}, cache['entries'])]),
+        ('ticket_events_clients', 'gauge', "Paneles conectados al flujo SSE", [({}, ticket_events.client_count())]),
+        ('log_records_dropped_total', 'counter', "Registros de log descartados por cola llena", [({}, log_handler.dropped)])
+    ]
+
+metrics_registry.add_collector(collect_runtime_metrics)
+
+@app.route("/metrics")
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    token = app.config['METRICS_TOKEN']
+    if token:
+        allowed = hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = session.get("role") == "admin" or request.remote_addr in METRICS_LOCAL_ADDRESSES
+    if not allowed:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+@app.route("/api/logging", methods=["GET", "PUT"])
+def logging_settings():
+    """Nivel del log en marcha (PUT {"level": "DEBUG"}) y registros descartados por cola llena"""
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    if request.method == "PUT":
+        level = str((request.get_json(silent=True) or {}).get("level", "")).upper()
+        if level not in LOG_LEVELS:
+            return jsonify({"success": False, "message": f"Nivel no válido: {', '.join(LOG_LEVELS)}"}), 400
+        logger.setLevel(level)
+        logger.warning("Nivel de log cambiado", extra={'level': level, 'user_id': session["user_id"]})
+    return jsonify({
+        "success": True,
+        "level": logging.getLevelName(logger.level),
+        "dropped": log_handler.dropped
+    })
+
+@app.route("/api/tickets/events")
+def ticket_events_stream():
+    """Flujo SSE con los eventos created, status-changed y resolved"""
+    if "user_id" not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    if request.method == 'HEAD':
+        # Sin cuerpo no hay nada que escuchar: no se ocupa hueco
+        return Response(mimetype='text/event-stream')
+    try:
+        subscriber = ticket_events.subscribe()
+    except TooManySubscribers:
+        response = jsonify({'error': 'Demasiados clientes conectados, intenta de nuevo más tarde'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    response = Response(
+        ticket_events.listen(subscriber, heartbeat=app.config['EVENTS_HEARTBEAT']),
+        mimetype='text/event-stream'
+    )
+    # El finally de listen() no se ejecuta si el cuerpo nunca se itera (HEAD o
+    # un cliente que se desconecta antes del primer fragmento): el hueco se
+    # libera siempre al cerrar la respuesta
+    response.call_on_close(lambda: ticket_events.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route("/api/cache")
+def cache_stats():
+    if "user_id" not in session or session.get("role") != "admin":
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return jsonify({"success": True, "cache": response_cache.stats()})
+
 @app.route("/check-session")
 def check_session():
     if "user_id" in session:
@@ -0,0 +1,256 @@
+"""Benchmarks de las rutas más usadas con línea base y umbral de regresión.
+
+Ejecuta las rutas dentro del proceso (cliente de pruebas de Flask) contra la
+MariaDB configurada, que debe ser una base local dedicada: antes de cada
+tamaño se completa con db.py seed hasta tener esa cantidad de quejas, y
+después se borran las quejas y los blobs que crearon los benchmarks.
+
+    python -m flaskr.benchmark --save              # guarda la línea base
+    python -m flaskr.benchmark                     # compara; sale con 1 si algo empeora
+    python -m flaskr.benchmark --sizes 1000 --rounds 20
+    python -m flaskr.benchmark --serializers       # coste por fila de la serialización
+
+Se compara la mediana de cada benchmark con la de la línea base; se considera
+regresión si supera la base en más de --threshold (20% por defecto).
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from . import app, db_pool, response_cache
+from .repository import Repository
+from .serializers import TicketListRow, dumps, orjson
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmark_baseline.json')
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Cuentas que crea db.py seed
+ADMIN_EMAIL = 'admin0@carga.utc.edu.mx'
+STUDENT_EMAIL = 'estudiante10@carga.utc.edu.mx'
+PASSWORD = 'carga123'
+
+
+def count_complaints():
+    conn = db_pool.acquire()
+    try:
+        return Repository(conn).count_complaints()
+    finally:
+        db_pool.release(conn)
+
+
+def last_ticket_id():
+    conn = db_pool.acquire()
+    try:
+        return Repository(conn).last_ticket_id()
+    finally:
+        db_pool.release(conn)
+
+
+def reset_dataset(last_id):
+    """Borra lo que crearon los benchmarks después de last_id (quejas, adjuntos y
+    sus blobs) para que cada tamaño y cada ejecución partan de la misma base.
+
+    Solo se borran los blobs de esas quejas que se quedan sin referencias; el
+    resto del almacén queda para el GC normal con su margen de gracia.
+    """
+    conn = db_pool.acquire()
+    try:
+        repo = Repository(conn)
+        blobs = repo.blobs_of_tickets_after(last_id)
+        repo.delete_tickets_after(last_id)
+        repo.recount_blob_refs()
+        repo.commit()
+        for sha256, *paths in blobs:
+            deleted = repo.delete_unreferenced_blob(sha256)
+            repo.commit()
+            if deleted:
+                for path in paths:
+                    abs_path = os.path.join(app.static_folder, path) if path else None
+                    if abs_path and os.path.exists(abs_path):
+                        os.remove(abs_path)
+    finally:
+        db_pool.release(conn)
+
+
+def ensure_dataset(size):
+    """Completa la base hasta size quejas; devuelve False si ya tiene bastantes más"""
+    current = count_complaints()
+    if current > size * 1.1:
+        return False
+    if current < size:
+        subprocess.run(
+            [sys.executable, 'db.py', 'seed', '--users', '500', '--complaints', str(size - current), '--seed', str(size)],
+            cwd=BASE_DIR, check=True
+        )
+    return True
+
+
+def login(client, email):
+    response = client.post('/login', json={'email': email, 'password': PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"No se pudo iniciar sesión como {email}: ejecuta primero db.py seed")
+
+
+def upload_form():
+    # Contenido distinto en cada ronda: con los mismos bytes, a partir de la
+    # segunda solo se mediría la deduplicación del almacén de blobs
+    evidence = f'evidencia del benchmark {uuid.uuid4().hex}\n'.encode() * 256
+    return {
+        'complaint_type': 'queja',
+        'category': 'tecnologia',
+        'subject': 'Benchmark de alta de quejas',
+        'description': 'Queja creada por el benchmark para medir la ruta de subida.',
+        'files': (io.BytesIO(evidence), 'evidencia.txt', 'text/plain')
+    }
+
+
+def benchmarks(ticket_id):
+    """Nombre -> (rol, petición); la petición recibe el cliente de pruebas"""
+    return {
+        'get_tickets': ('admin', lambda client: client.get('/api/tickets')),
+        'get_tickets_by_category': ('admin', lambda client: client.get('/api/tickets/filter/infraestructura')),
+        'get_tickets_stats': ('admin', lambda client: client.get('/api/tickets/stats')),
+        'api_ticket_detail': ('admin', lambda client: client.get(f'/api/tickets/{ticket_id}')),
+        'post_upload': ('student', lambda client: client.post('/post', data=upload_form(),
+                                                              content_type='multipart/form-data'))
+    }
+
+
+def measure(client, request, rounds, warmup):
+    """Tiempos en ms de rounds peticiones sin caché de respuestas"""
+    timings = []
+    for i in range(warmup + rounds):
+        response_cache.clear()
+        started = time.perf_counter()
+        response = request(client)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"Respuesta {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(timings[0], 3),
+        'p95_ms': round(timings[max(0, round(0.95 * len(timings)) - 1)], 3),
+        'rounds': rounds
+    }
+
+
+def run(sizes, rounds, warmup):
+    results = {}
+    for size in sizes:
+        if not ensure_dataset(size):
+            print(f"⚠️ La base tiene más de {size} quejas; se omite ese tamaño")
+            continue
+        clients = {'admin': app.test_client(), 'student': app.test_client()}
+        login(clients['admin'], ADMIN_EMAIL)
+        login(clients['student'], STUDENT_EMAIL)
+        ticket_id = clients['admin'].get('/api/tickets?limit=1').get_json()['tickets'][0]['id']
+        last_id = last_ticket_id()
+        try:
+            for name, (role, request) in benchmarks(ticket_id).items():
+                result = measure(clients[role], request, rounds, warmup)
+                results[f"{name}@{size}"] = result
+                print(f"{name:<26}{size:>8} quejas  mediana {result['median_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms")
+        finally:
+            reset_dataset(last_id)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lista de regresiones (nombre, base, actual) respecto a la línea base"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1
+        marker = '✗' if change > threshold else '✓'
+        print(f"{marker} {key:<36} base {base['median_ms']:>9.2f} ms  actual {result['median_ms']:>9.2f} ms  {change:+.1%}")
+        if change > threshold:
+            regressions.append((key, base['median_ms'], result['median_ms']))
+    return regressions
+
+
+def synthetic_rows(count):
+    """Filas con la forma de las del listado (columnas + imágenes) sin tocar la base"""
+    now = datetime(2025, 9, 1, 12, 0, 0)
+    categories = ['servicios-academicos', 'infraestructura', 'tecnologia', 'cafeteria']
+    return [(
+        i, 'queja', categories[i % len(categories)], f'Asunto del ticket {i}',
+        'Descripción del problema reportado por el estudiante. ' * 3,
+        date(2025, 8, 1) + timedelta(days=i % 30), 'pendiente', now - timedelta(minutes=i),
+        'Ana', 'López García', 'AL' if i % 2 else None,
+        f'uploads/blobs/ab/cd/{i:064x}_320.webp' if i % 3 == 0 else None, None
+    ) for i in range(count)]
+
+
+def run_serializers(count, rounds):
+    """Coste por fila de convertir filas a dicts y de codificar el listado como JSON"""
+    rows = synthetic_rows(count)
+    to_dict_times = []
+    encode_times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        tickets = [TicketListRow(row).to_dict() for row in rows]
+        to_dict_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        dumps({'success': True, 'tickets': tickets, 'total': len(tickets)})
+        encode_times.append(time.perf_counter() - started)
+    to_dict_us = statistics.median(to_dict_times) / count * 1e6
+    encode_us = statistics.median(encode_times) / count * 1e6
+    print(f"{count} filas, mediana de {rounds} rondas (codificador: {'orjson' if orjson else 'json'})")
+    print(f"  fila -> dict   {to_dict_us:8.2f} µs/fila")
+    print(f"  dict -> JSON   {encode_us:8.2f} µs/fila")
+    print(f"  total          {to_dict_us + encode_us:8.2f} µs/fila")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de rutas con línea base")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="tamaños de la base en quejas, separados por comas")
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.20, help="regresión tolerada sobre la mediana")
+    parser.add_argument('--save', action='store_true', help="guarda los resultados como nueva línea base")
+    parser.add_argument('--serializers', action='store_true',
+                        help="solo mide la serialización de 10k filas del listado (no usa la base)")
+    args = parser.parse_args()
+
+    if args.serializers:
+        run_serializers(10000, args.rounds)
+        return
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    results = run(sizes, args.rounds, args.warmup)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Línea base guardada en {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No hay línea base en {args.baseline}; ejecuta con --save")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} benchmarks empeoraron más de {args.threshold:.0%}")
+        sys.exit(1)
+    print("✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import tempfile
+import time
+
+CHUNK_SIZE = 64 * 1024
+
+# Firmas (magic bytes) del contenido real de los archivos aceptados
+MAGIC_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc"),
+    (b"PK\x03\x04", "docx"),
+]
+
+# Extensiones que comparten el mismo tipo de contenido
+EXTENSION_KINDS = {"jpeg": "jpg"}
+
+
+class UploadRejected(ValueError):
+    """El archivo subido no pasa la validación (vacío, muy grande o tipo incorrecto)"""
+
+
+def sniff_type(head):
+    """Tipo real del archivo según sus primeros bytes, o None si no se reconoce"""
+    for signature, kind in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    # Texto plano: sin bytes nulos al inicio
+    if head and b"\x00" not in head:
+        return "txt"
+    return None
+
+
+class BlobStore:
+    """Almacén de archivos direccionado por contenido.
+
+    Cada archivo se guarda una sola vez como <sha256>.<ext> dentro de
+    subdirectorios por prefijo (ab/cd/abcd...); las filas de
+    complaint_attachments y resolution_images lo referencian por sha256.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, sha256, ext):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}.{ext}")
+
+    def put(self, stream, ext, max_size=None):
+        """Guarda el contenido del stream leyéndolo una sola vez.
+
+        Escribe a un temporal mientras calcula tamaño y SHA-256, comprueba con
+        los primeros bytes que el contenido corresponde a la extensión y corta
+        en cuanto se supera max_size. Al final renombra el temporal de forma
+        atómica a su ruta por contenido (o lo descarta si ya existía).
+        Devuelve (sha256, ruta absoluta, tamaño en bytes); lanza UploadRejected.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    raise UploadRejected("Archivo vacío")
+                if sniff_type(chunk) != EXTENSION_KINDS.get(ext, ext):
+                    raise UploadRejected(f"El contenido no corresponde a un archivo .{ext}")
+                while chunk:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise UploadRejected(f"Archivo muy grande (máximo {max_size / 1024 / 1024:.0f}MB)")
+                    digest.update(chunk)
+                    out.write(chunk)
+                    chunk = stream.read(CHUNK_SIZE)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256, ext)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                # Reutilizado: se renueva la fecha para que el GC no lo borre mientras tanto
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return sha256, path, size
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def remove_unknown_files(self, known_paths, grace_seconds):
+        """Borra archivos del almacén que no están en known_paths (rutas absolutas)
+        y son más antiguos que grace_seconds; devuelve cuántos se borraron."""
+        removed = 0
+        cutoff = time.time() - grace_seconds
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path in known_paths:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
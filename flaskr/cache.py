@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Caché en memoria con TTL por entrada y desalojo LRU, segura entre hilos.
+
+    Las claves son cadenas con prefijos ("tickets:", "stats", "ticket:<id>")
+    para poder invalidar grupos de entradas con invalidate(prefix).
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, *prefixes):
+        """Elimina todas las entradas cuya clave empieza por alguno de los prefijos"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefixes)]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
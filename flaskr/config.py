@@ -0,0 +1,10 @@
+# Configuración compartida por la aplicación (flaskr) y los scripts (db.py).
+# Sin importaciones relativas: db.py se ejecuta como script desde esta carpeta.
+
+DATABASE = {
+    'user': "user",
+    'password': "123",
+    'host': "127.0.0.1",
+    'port': 3305,
+    'database': "db"
+}
@@ -1,25 +1,44 @@
+import io
+import os
 import sys
+import random
+import argparse
 import mariadb
+from datetime import datetime, timedelta
+from config import DATABASE
+from passwords import hash_password, parse_hash
 
 def get_db_connection():
     try:
-        conn = mariadb.connect(
-            user="user",
-            password="123",
-            host="127.0.0.1",
-            port=3305,
-            database="db"
-        )
-        return conn
+        return mariadb.connect(**DATABASE)
     except mariadb.Error as e:
         print(f"DB Connection Error: {e}")
         sys.exit(1)
 
-conn = get_db_connection()
-cur = conn.cursor()
+# Conexión del script: se abre al ejecutarlo (ver __main__), no al importar el módulo
+conn = None
+cur = None
 
-def init_users():
-    schema = """
+# Recalcula ticket_counters desde complaints. Cuenta todos los tickets, igual
+# que los incrementos de post(), la importación y los cambios de estado, que no
+# miran users.is_active
+REBUILD_TICKET_COUNTERS = [
+    "DELETE FROM ticket_counters",
+    """
+    INSERT INTO ticket_counters (status, category, total)
+    SELECT status, category, COUNT(*)
+    FROM complaints
+    GROUP BY status, category
+    """
+]
+
+# Migraciones versionadas: todo el DDL del esquema vive aquí y nunca en una petición.
+# Cada migración es (versión, nombre, sentencias). MariaDB confirma cada sentencia
+# DDL por separado, así que las sentencias usan IF [NOT] EXISTS para que una
+# migración interrumpida pueda volver a ejecutarse sin errores.
+MIGRATIONS = [
+    (1, "tablas base", [
+        """
         CREATE TABLE IF NOT EXISTS users (
             id INT AUTO_INCREMENT PRIMARY KEY,
             email VARCHAR(100) NOT NULL UNIQUE,
@@ -36,17 +55,9 @@ def init_users():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             is_active BOOLEAN DEFAULT TRUE
-        );
-    """
-    try:
-        cur.execute(schema)
-        conn.commit()
-    except mariadb.Error as e:
-        print(f"Error creating users table: {e}")
-        sys.exit(1)
-
-def init_complaints():
-    schema = """
+        )
+        """,
+        """
         CREATE TABLE IF NOT EXISTS complaints (
             id INT AUTO_INCREMENT PRIMARY KEY,
             user_id INT NOT NULL,
@@ -68,17 +79,9 @@ def init_complaints():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        );
-    """
-    try:
-        cur.execute(schema)
-        conn.commit()
-    except mariadb.Error as e:
-        print(f"Error creating complaints table: {e}")
-        sys.exit(1)
-
-def init_complaint_responses():
-    schema = """
+        )
+        """,
+        """
         CREATE TABLE IF NOT EXISTS complaint_responses (
             id INT AUTO_INCREMENT PRIMARY KEY,
             complaint_id INT NOT NULL,
@@ -89,36 +92,171 @@ def init_complaint_responses():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             FOREIGN KEY (complaint_id) REFERENCES complaints(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS complaint_attachments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            complaint_id INT NOT NULL,
+            original_filename VARCHAR(255) NOT NULL,
+            saved_filename VARCHAR(255) NOT NULL,
+            file_path VARCHAR(500) NOT NULL,
+            file_size INT NOT NULL,
+            file_type VARCHAR(10) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (complaint_id) REFERENCES complaints(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS resolution_images (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            complaint_id INT NOT NULL,
+            saved_filename VARCHAR(255) NOT NULL,
+            file_path VARCHAR(500) NOT NULL,
+            file_type VARCHAR(10) NOT NULL,
+            file_size INT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (complaint_id) REFERENCES complaints(id) ON DELETE CASCADE
+        )
+        """,
+        # Contadores materializados por (estado, categoría) para /api/tickets/stats
+        """
+        CREATE TABLE IF NOT EXISTS ticket_counters (
+            status VARCHAR(20) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            total INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, category)
+        )
+        """,
+        # Almacén de adjuntos direccionado por contenido (ver flaskr/blobs.py)
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 CHAR(64) PRIMARY KEY,
+            file_path VARCHAR(500) NOT NULL,
+            file_type VARCHAR(10) NOT NULL,
+            file_size INT NOT NULL,
+            processing_status ENUM('pending', 'ready', 'failed') NOT NULL DEFAULT 'ready',
+            thumb_path VARCHAR(500),
+            medium_path VARCHAR(500),
+            ref_count INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    ]),
+    # Procesamiento en segundo plano, derivados WebP y blobs en las tablas de adjuntos
+    (2, "columnas de imagen en adjuntos", [
+        statement
+        for table in ("complaint_attachments", "resolution_images")
+        for statement in (
+            f"""ALTER TABLE {table}
+               ADD COLUMN IF NOT EXISTS processing_status ENUM('pending', 'ready', 'failed') NOT NULL DEFAULT 'ready'""",
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS thumb_path VARCHAR(500)",
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS medium_path VARCHAR(500)",
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS sha256 CHAR(64)",
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_sha256 ON {table}(sha256)"
+        )
+    ]),
+    (3, "índices de listados y búsqueda", [
+        "CREATE INDEX IF NOT EXISTS idx_complaints_created_at ON complaints(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_updated_at ON complaints(updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_category_updated_at ON complaints(category, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_status_created_at ON complaints(status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_category_created_at ON complaints(category, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_type_created_at ON complaints(complaint_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_complaints_user_created_at ON complaints(user_id, created_at)",
+        "CREATE FULLTEXT INDEX IF NOT EXISTS idx_complaints_fulltext ON complaints(subject, description)",
+        "CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users(updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)"
+    ]),
+    # email y user_id ya tienen índice por su clave UNIQUE
+    (4, "quitar índices duplicados de users", [
+        "DROP INDEX IF EXISTS idx_users_email ON users",
+        "DROP INDEX IF EXISTS idx_users_user_id ON users"
+    ]),
+    # Primera imagen de cada ticket: el índice resuelve WHERE complaint_id = ? AND
+    # file_type IN (...) y el ORDER BY id (incluido en todo índice secundario de
+    # InnoDB), así que solo se lee la fila elegida. No es un índice cubriente: las
+    # rutas (file_path, thumb_path, medium_path, VARCHAR(500) cada una) superan el
+    # máximo de 3072 bytes por clave en utf8mb4, y un índice de prefijo no cubre
+    (5, "índices por ticket en adjuntos y respuestas", [
+        "CREATE INDEX IF NOT EXISTS idx_complaint_attachments_complaint_image ON complaint_attachments(complaint_id, file_type)",
+        "CREATE INDEX IF NOT EXISTS idx_resolution_images_complaint_image ON resolution_images(complaint_id, file_type)",
+        # Una sola respuesta por ticket: se conserva la más reciente de las duplicadas
+        """
+        DELETE older FROM complaint_responses older
+        INNER JOIN complaint_responses newer
+            ON newer.complaint_id = older.complaint_id AND newer.id > older.id
+        """,
+        """
+        ALTER TABLE complaint_responses
+        ADD UNIQUE KEY IF NOT EXISTS uq_complaint_responses_complaint_id (complaint_id)
+        """
+    ]),
+    # Cada uno es prefijo izquierdo de un índice compuesto (status|category|user_id,
+    # created_at), que ya sirve a las mismas consultas y a la clave foránea de user_id
+    (6, "quitar índices simples de complaints", [
+        "DROP INDEX IF EXISTS idx_complaints_user_id ON complaints",
+        "DROP INDEX IF EXISTS idx_complaints_status ON complaints",
+        "DROP INDEX IF EXISTS idx_complaints_category ON complaints"
+    ]),
+    # La tabla se creó vacía en la migración 1; sin esto /api/tickets/stats
+    # devolvería ceros en una base existente hasta ejecutar initDB
+    (7, "rellenar ticket_counters", REBUILD_TICKET_COUNTERS),
+    # updated_at es parte del sello de versión de los ETag: con resolución de un
+    # segundo, dos cambios dentro del mismo segundo producían el mismo ETag
+    (8, "updated_at con microsegundos", [
+        f"""ALTER TABLE {table} MODIFY updated_at TIMESTAMP(6)
+            DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"""
+        for table in ("users", "complaints")
+    ])
+]
+
+def init_schema_migrations():
+    schema = """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """
     try:
         cur.execute(schema)
         conn.commit()
     except mariadb.Error as e:
-        print(f"Error creating complaint_responses table: {e}")
+        print(f"Error creating schema_migrations table: {e}")
         sys.exit(1)
 
-def create_indexes():
-    indexes = [
-        "CREATE INDEX idx_complaints_user_id ON complaints(user_id);",
-        "CREATE INDEX idx_complaints_status ON complaints(status);",
-        "CREATE INDEX idx_complaints_created_at ON complaints(created_at);",
-        "CREATE INDEX idx_complaints_category ON complaints(category);",
-        "CREATE INDEX idx_users_email ON users(email);",
-        "CREATE INDEX idx_users_user_id ON users(user_id);",
-        "CREATE INDEX idx_users_role ON users(role);"
-    ]
-    
-    for index in indexes:
+def migrate():
+    """Aplica en orden las migraciones que aún no están en schema_migrations"""
+    init_schema_migrations()
+    cur.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cur.fetchall()}
+    pending = [migration for migration in MIGRATIONS if migration[0] not in applied]
+    if not pending:
+        print("✅ Esquema al día")
+        return
+    for version, name, statements in pending:
         try:
-            cur.execute(index)
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+            print(f"✅ Migración {version} aplicada: {name}")
         except mariadb.Error as e:
-            if "Duplicate key name" in str(e):
-                print(f"ℹ️ Índice ya existe, se omite: {index.split()[2]}")
-            else:
-                print(f"❌ Error al crear índice: {e}")
-    conn.commit()
-    print("✅ Índices verificados/creados")
+            conn.rollback()
+            print(f"❌ Error en la migración {version} ({name}): {e}")
+            sys.exit(1)
+
+def rebuild_ticket_counters():
+    """Recalcula los contadores desde cero a partir de la tabla complaints"""
+    try:
+        for statement in REBUILD_TICKET_COUNTERS:
+            cur.execute(statement)
+        conn.commit()
+        print("✅ Contadores de tickets recalculados")
+    except mariadb.Error as e:
+        conn.rollback()
+        print(f"❌ Error recalculando contadores: {e}")
 
 def insert_sample_data():
     try:
@@ -128,7 +266,7 @@ def insert_sample_data():
                                personal_description) 
             VALUES (
                 'admin@utc.edu.mx', 
-                '222', 
+                ?, 
                 '1111111112', 
                 'admin', 
                 'María', 
@@ -147,7 +285,7 @@ def insert_sample_data():
                                personal_description) 
             VALUES (
                 'juan.perez@utc.edu.mx', 
-                '123', 
+                ?, 
                 '1111111111', 
                 'student', 
                 'Juan', 
@@ -160,19 +298,21 @@ def insert_sample_data():
             ) ON DUPLICATE KEY UPDATE email=email;
         """
 
-        cur.execute(admin_user)
-        cur.execute(student_user)
+        # Contraseñas de prueba: 222 (admin) y 123 (estudiante)
+        cur.execute(admin_user, (hash_password('222'),))
+        cur.execute(student_user, (hash_password('123'),))
 
         # Obtener ID del usuario estudiante (por si cambia)
         cur.execute("SELECT id FROM users WHERE email = 'juan.perez@utc.edu.mx'")
         student_id = cur.fetchone()[0]
 
+        # Solo se inserta una vez aunque initDB se ejecute varias veces
         sample_complaint = """
             INSERT INTO complaints (
                 user_id, complaint_type, category,  
                 subject, description, incident_date, status
             ) 
-            VALUES (
+            SELECT
                 ?, 
                 'queja', 
                 'servicios-academicos', 
@@ -180,10 +320,14 @@ def insert_sample_data():
                 'No he podido inscribirme a las materias optativas del semestre debido a problemas técnicos en el sistema. He intentado varias veces pero siempre me aparece un error.',
                 '2025-07-20',
                 'pendiente'
+            FROM DUAL
+            WHERE NOT EXISTS (
+                SELECT 1 FROM complaints
+                WHERE user_id = ? AND subject = 'Problema con inscripción a materias optativas'
             );
         """
 
-        cur.execute(sample_complaint, (student_id,))
+        cur.execute(sample_complaint, (student_id, student_id))
         conn.commit()
         print("✅ Datos de prueba insertados correctamente")
     except mariadb.Error as e:
@@ -191,13 +335,254 @@ def insert_sample_data():
 
 
 
+# Datos sintéticos para reproducir volúmenes reales en local (python db.py seed).
+# Los usuarios generados usan el dominio SYNTHETIC_DOMAIN y la contraseña
+# SYNTHETIC_PASSWORD, que son las que usa loadtest.py por defecto.
+SYNTHETIC_DOMAIN = "carga.utc.edu.mx"
+SYNTHETIC_PASSWORD = "carga123"
+
+SYNTHETIC_NAMES = ["Ana", "Luis", "Sofía", "Carlos", "Valeria", "Diego", "Fernanda", "Jorge", "Camila", "Miguel"]
+SYNTHETIC_LAST_NAMES = ["Hernández", "García", "Martínez", "López", "Ramírez", "Torres", "Flores", "Cruz", "Morales", "Reyes"]
+SYNTHETIC_AREAS = [
+    ("Ingeniería en Sistemas", "Desarrollo Web"),
+    ("Ingeniería Industrial", "Calidad"),
+    ("Administración", "Finanzas"),
+    ("Mecatrónica", "Automatización"),
+    ("Contaduría", None)
+]
+
+# Pesos aproximados de un semestre real
+SYNTHETIC_CATEGORY_WEIGHTS = {
+    'servicios-academicos': 25,
+    'infraestructura': 20,
+    'tecnologia': 15,
+    'administrativo': 10,
+    'cafeteria': 10,
+    'biblioteca': 8,
+    'servicios-estudiantiles': 8,
+    'otro': 4
+}
+SYNTHETIC_TYPE_WEIGHTS = {'queja': 60, 'sugerencia': 25, 'peticion': 15}
+# Los tickets recientes siguen abiertos; los de más de 30 días casi todos resueltos
+SYNTHETIC_STATUS_WEIGHTS = {
+    'recent': {'pendiente': 50, 'en-proceso': 30, 'resuelto': 15, 'escalado': 5},
+    'old': {'pendiente': 10, 'en-proceso': 10, 'resuelto': 75, 'escalado': 5}
+}
+SYNTHETIC_TOPICS = {
+    'servicios-academicos': ["inscripción a materias", "calificaciones", "horario de clases", "asesorías"],
+    'infraestructura': ["aire acondicionado del aula", "baños del edificio B", "iluminación del estacionamiento", "bancas rotas"],
+    'tecnologia': ["wifi del campus", "laboratorio de cómputo", "plataforma en línea", "proyector del aula"],
+    'administrativo': ["trámite de constancia", "pago de colegiatura", "credencial de estudiante", "becas"],
+    'cafeteria': ["precios de la cafetería", "higiene en la cafetería", "menú vegetariano", "filas en la cafetería"],
+    'biblioteca': ["horario de la biblioteca", "préstamo de libros", "ruido en la sala de estudio", "libros faltantes"],
+    'servicios-estudiantiles': ["actividades deportivas", "servicio médico", "orientación psicológica", "transporte escolar"],
+    'otro': ["seguridad en el campus", "eventos culturales", "objetos perdidos", "áreas verdes"]
+}
+
+# Adjuntos de ejemplo: pocos archivos compartidos por muchos tickets (deduplicados por sha256)
+SYNTHETIC_ATTACHMENTS = [
+    ("png", b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS"
+            b"\xde\x00\x00\x00\x0cIDATx\x9cc8\xc3\xc0\x00\x00\x02h\x00\xcd%\xe2\x9cn\x00\x00\x00\x00IEND\xaeB`\x82"),
+    ("pdf", b"%PDF-1.4\n% comprobante de prueba\n%%EOF\n"),
+    ("txt", "Evidencia generada para pruebas de carga.\n".encode())
+]
+
+SYNTHETIC_BATCH_SIZE = 1000
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def store_synthetic_attachments():
+    """Guarda los adjuntos de ejemplo en el almacén de blobs; devuelve [(sha256, ruta relativa, tipo, tamaño)]"""
+    from blobs import BlobStore
+
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    store = BlobStore(os.path.join(static_folder, "uploads", "blobs"))
+    stored = []
+    for ext, content in SYNTHETIC_ATTACHMENTS:
+        sha256, path, size = store.put(io.BytesIO(content), ext)
+        stored.append((sha256, os.path.relpath(path, static_folder).replace(os.sep, "/"), ext, size))
+    return stored
+
+def seed_synthetic_data(users, complaints, seed=42, attachment_share=0.3):
+    """Genera users usuarios y complaints quejas con distribuciones realistas de
+    categoría, tipo, estado y fecha (último año, más densas en los meses recientes),
+    más respuestas de los tickets atendidos y adjuntos en una parte de ellos.
+    Se puede ejecutar varias veces: los usuarios se reutilizan por email."""
+    rng = random.Random(seed)
+    started = datetime.now()
+    try:
+        # Usuarios: uno de cada 50 es admin
+        admins = max(1, users // 50)
+        # Un solo hash para todas las cuentas sintéticas: calcular scrypt por
+        # usuario haría el seed de miles de cuentas innecesariamente lento
+        password_hash = hash_password(SYNTHETIC_PASSWORD)
+        user_rows = []
+        for i in range(users):
+            role = 'admin' if i < admins else 'student'
+            name = rng.choice(SYNTHETIC_NAMES)
+            last_name = f"{rng.choice(SYNTHETIC_LAST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}"
+            area, speciality = rng.choice(SYNTHETIC_AREAS)
+            prefix = "admin" if role == 'admin' else "estudiante"
+            user_rows.append((
+                f"{prefix}{i}@{SYNTHETIC_DOMAIN}", password_hash, f"9{i:09d}", role, name, last_name,
+                area, speciality, rng.randint(1, 9), f"{name[0]}{last_name[0]}".upper()
+            ))
+        for start in range(0, len(user_rows), SYNTHETIC_BATCH_SIZE):
+            cur.executemany("""
+                INSERT INTO users (email, password, user_id, role, name, last_name,
+                                   study_area, study_speciality, term, avatar_initials)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON DUPLICATE KEY UPDATE email = email
+            """, user_rows[start:start + SYNTHETIC_BATCH_SIZE])
+        conn.commit()
+        cur.execute("SELECT id, role FROM users WHERE email LIKE ?", (f"%@{SYNTHETIC_DOMAIN}",))
+        user_ids = [row[0] for row in cur.fetchall() if row[1] == 'student']
+        if not user_ids:
+            print("❌ Se necesita al menos un estudiante: usa --users 2 o más")
+            sys.exit(1)
+        admin_names = [f"{row[4]} {row[5]}" for row in user_rows[:admins]]
+        print(f"✅ Usuarios sintéticos: {len(user_rows)} ({admins} admins)")
+
+        # Quejas
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM complaints")
+        first_new_id = cur.fetchone()[0] + 1
+        now = datetime.now()
+        batch = []
+        for i in range(complaints):
+            category = weighted_choice(rng, SYNTHETIC_CATEGORY_WEIGHTS)
+            complaint_type = weighted_choice(rng, SYNTHETIC_TYPE_WEIGHTS)
+            age_days = rng.triangular(0, 365, 0)
+            created_at = (now - timedelta(days=age_days, seconds=rng.randint(0, 86399))).replace(microsecond=0)
+            status = weighted_choice(rng, SYNTHETIC_STATUS_WEIGHTS['old' if age_days > 30 else 'recent'])
+            topic = rng.choice(SYNTHETIC_TOPICS[category])
+            incident_date = (created_at - timedelta(days=rng.randint(0, 7))).date() if rng.random() < 0.8 else None
+            batch.append((
+                rng.choice(user_ids), complaint_type, category,
+                f"{complaint_type.capitalize()} sobre {topic}"[:100],
+                f"Quiero reportar una situación relacionada con {topic}. "
+                f"Se ha presentado varias veces durante el semestre y afecta a varios compañeros. (#{i})",
+                incident_date, status, created_at
+            ))
+            if len(batch) >= SYNTHETIC_BATCH_SIZE:
+                cur.executemany("""
+                    INSERT INTO complaints (user_id, complaint_type, category, subject, description,
+                                            incident_date, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+                conn.commit()
+                batch.clear()
+        if batch:
+            cur.executemany("""
+                INSERT INTO complaints (user_id, complaint_type, category, subject, description,
+                                        incident_date, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            conn.commit()
+        print(f"✅ Quejas sintéticas: {complaints}")
+
+        # Respuestas y adjuntos de las quejas recién creadas
+        attachments = store_synthetic_attachments()
+        images = [attachment for attachment in attachments if attachment[2] == 'png']
+        cur.execute("SELECT id, status, created_at FROM complaints WHERE id >= ?", (first_new_id,))
+        new_complaints = cur.fetchall()
+        responses = []
+        complaint_attachments = []
+        resolution_images = []
+        for complaint_id, status, created_at in new_complaints:
+            if status in ('resuelto', 'escalado') or (status == 'en-proceso' and rng.random() < 0.5):
+                responses.append((
+                    complaint_id, rng.choice(admin_names),
+                    "Se revisó el caso con el área correspondiente y se dio seguimiento.",
+                    (created_at + timedelta(days=rng.randint(1, 14))).date(),
+                    round(rng.uniform(0.5, 12), 2)
+                ))
+                if status == 'resuelto' and rng.random() < 0.4:
+                    sha256, file_path, file_type, file_size = rng.choice(images)
+                    resolution_images.append((complaint_id, file_path.rsplit("/", 1)[-1], file_path,
+                                              file_type, file_size, sha256))
+            if rng.random() < attachment_share:
+                for sha256, file_path, file_type, file_size in rng.sample(attachments, rng.randint(1, len(attachments))):
+                    complaint_attachments.append((complaint_id, f"evidencia.{file_type}", file_path.rsplit("/", 1)[-1],
+                                                  file_path, file_size, file_type, sha256))
+        for start in range(0, len(responses), SYNTHETIC_BATCH_SIZE):
+            cur.executemany("""
+                INSERT INTO complaint_responses (complaint_id, assigned_to, admin_response, resolution_date, time_spent)
+                VALUES (?, ?, ?, ?, ?)
+            """, responses[start:start + SYNTHETIC_BATCH_SIZE])
+        for start in range(0, len(complaint_attachments), SYNTHETIC_BATCH_SIZE):
+            cur.executemany("""
+                INSERT INTO complaint_attachments (complaint_id, original_filename, saved_filename,
+                                                   file_path, file_size, file_type, sha256)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, complaint_attachments[start:start + SYNTHETIC_BATCH_SIZE])
+        for start in range(0, len(resolution_images), SYNTHETIC_BATCH_SIZE):
+            cur.executemany("""
+                INSERT INTO resolution_images (complaint_id, saved_filename, file_path, file_type, file_size, sha256)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, resolution_images[start:start + SYNTHETIC_BATCH_SIZE])
+        references = {}
+        for row in complaint_attachments:
+            references[row[6]] = references.get(row[6], 0) + 1
+        for row in resolution_images:
+            references[row[5]] = references.get(row[5], 0) + 1
+        cur.executemany("""
+            INSERT INTO blobs (sha256, file_path, file_type, file_size, processing_status, ref_count)
+            VALUES (?, ?, ?, ?, 'ready', ?)
+            ON DUPLICATE KEY UPDATE ref_count = ref_count + VALUES(ref_count)
+        """, [(sha256, file_path, file_type, file_size, references.get(sha256, 0))
+              for sha256, file_path, file_type, file_size in attachments])
+        conn.commit()
+        print(f"✅ Respuestas: {len(responses)} | adjuntos: {len(complaint_attachments)} | "
+              f"imágenes de resolución: {len(resolution_images)}")
+    except mariadb.Error as e:
+        conn.rollback()
+        print(f"❌ Error generando datos sintéticos: {e}")
+        sys.exit(1)
+    rebuild_ticket_counters()
+    print(f"⏱️ Datos generados en {(datetime.now() - started).total_seconds():.1f}s")
+
+def hash_plaintext_passwords():
+    """Convierte a scrypt las contraseñas que siguen en texto plano (el login
+    también las migra, pero solo a medida que cada usuario entra)"""
+    try:
+        cur.execute("SELECT id, password FROM users")
+        pending = [(user_id, password) for user_id, password in cur.fetchall() if parse_hash(password) is None]
+        for user_id, password in pending:
+            # updated_at se conserva para no invalidar los ETags de los listados
+            cur.execute("UPDATE users SET password = ?, updated_at = updated_at WHERE id = ?",
+                        (hash_password(password), user_id))
+        conn.commit()
+        print(f"✅ Contraseñas convertidas: {len(pending)}")
+    except mariadb.Error as e:
+        conn.rollback()
+        print(f"❌ Error convirtiendo contraseñas: {e}")
+        sys.exit(1)
+
 def initDB():
-    init_users()
-    init_complaints()
-    init_complaint_responses()
-    create_indexes()
+    migrate()
     insert_sample_data()
+    rebuild_ticket_counters()
 
 if __name__ == "__main__":
-    initDB()
+    parser = argparse.ArgumentParser(description="Esquema y datos de prueba (la importación masiva es flask --app flaskr import-tickets)")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("migrate", help="solo aplica migraciones, sin datos de prueba")
+    seed_parser = commands.add_parser("seed", help="genera usuarios, quejas, respuestas y adjuntos sintéticos")
+    seed_parser.add_argument("--users", type=int, default=500)
+    seed_parser.add_argument("--complaints", type=int, default=10000)
+    seed_parser.add_argument("--seed", type=int, default=42)
+    commands.add_parser("hash-passwords", help="convierte a scrypt las contraseñas en texto plano")
+    args = parser.parse_args()
 
+    conn = get_db_connection()
+    cur = conn.cursor()
+    if args.command == "migrate":
+        migrate()
+    elif args.command == "hash-passwords":
+        hash_plaintext_passwords()
+    elif args.command == "seed":
+        migrate()
+        seed_synthetic_data(args.users, args.complaints, args.seed)
+    else:
+        initDB()
@@ -0,0 +1,75 @@
+import json
+import queue
+import threading
+
+
+class TooManySubscribers(Exception):
+    """Se alcanzó el máximo de clientes SSE conectados a la vez"""
+
+
+class Subscriber:
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        # Se activa si el cliente no consume a tiempo y se pierden eventos
+        self.overflowed = False
+
+
+class EventBroadcaster:
+    """Difusor en proceso de eventos de tickets hacia clientes SSE.
+
+    Cada cliente tiene una cola acotada; si se llena, el cliente se marca como
+    desbordado y recibe un evento "resync" para que recargue el estado completo.
+    Cada cliente conectado ocupa además un hilo del servidor, así que como mucho
+    se admiten max_clients a la vez (None: sin límite).
+    """
+
+    def __init__(self, max_queue=100, max_clients=None):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Registra un cliente nuevo; lanza TooManySubscribers si no hay hueco"""
+        subscriber = Subscriber(self.max_queue)
+        with self._lock:
+            if self.max_clients is not None and len(self._subscribers) >= self.max_clients:
+                raise TooManySubscribers(f"Máximo de {self.max_clients} clientes conectados")
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Libera el hueco del cliente; se puede llamar más de una vez"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.overflowed = True
+
+    def listen(self, subscriber, heartbeat=15.0):
+        """Generador de mensajes SSE para un cliente; envía un comentario como latido"""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.overflowed:
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+            yield format_sse("resync", {})
+        finally:
+            self.unsubscribe(subscriber)
+
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
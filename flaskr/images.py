@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
+
+# Derivados WebP por ancho máximo: miniatura para listados y mediano para el detalle
+DERIVATIVE_WIDTHS = {
+    'thumb': 320,
+    'medium': 800
+}
+
+
+def derivative_path(file_path, name):
+    base = file_path.rsplit('.', 1)[0]
+    return f"{base}_{DERIVATIVE_WIDTHS[name]}.webp"
+
+
+def save_derivatives(img, file_path):
+    """Genera los derivados WebP de la imagen; devuelve {nombre: ruta}"""
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+    derivatives = {}
+    for name, width in DERIVATIVE_WIDTHS.items():
+        path = derivative_path(file_path, name)
+        tmp_path = f"{path}.tmp"
+        derivative = img.copy()
+        if derivative.width > width:
+            height = max(1, round(derivative.height * width / derivative.width))
+            derivative = derivative.resize((width, height), Image.Resampling.LANCZOS)
+        derivative.save(tmp_path, 'WEBP', quality=80, method=4)
+        os.replace(tmp_path, path)
+        derivatives[name] = path
+    return derivatives
+
+
+def optimize_image(file_path):
+    """Genera los derivados WebP optimizados de una imagen ya guardada.
+
+    El original no se modifica: su nombre es el SHA-256 de su contenido (ver
+    blobs.py) y los listados y el detalle sirven los derivados. Se ejecuta en
+    un proceso del pool; devuelve las rutas absolutas de los derivados y los
+    segundos empleados.
+    """
+    started = time.perf_counter()
+    with Image.open(file_path) as img:
+        derivatives = save_derivatives(img, file_path)
+    return {
+        'derivatives': derivatives,
+        'seconds': time.perf_counter() - started
+    }
+
+
+class ImageProcessor:
+    """Pool de procesos para optimizar imágenes fuera de la petición"""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Descarta un pool roto (si nadie lo ha reemplazado ya) para crear otro"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def submit(self, file_path, callback):
+        """Encola la optimización; callback(future) se llama al terminar.
+
+        Si un proceso del pool murió (por ejemplo, por falta de memoria) el pool
+        queda roto y rechaza todo: se sustituye por uno nuevo y se reintenta una vez.
+        """
+        executor = self._get_executor()
+        try:
+            future = executor.submit(optimize_image, file_path)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            future = self._get_executor().submit(optimize_image, file_path)
+        future.add_done_callback(callback)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
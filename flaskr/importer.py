@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from .schema import CATEGORIES, COMPLAINT_TYPES, TICKET_STATUSES
+
+# Mismas reglas que el formulario de /post
+SUBJECT_LENGTH = (5, 100)
+DESCRIPTION_MIN_LENGTH = 20
+
+# Rechazos que se guardan en el informe (el total se cuenta siempre)
+MAX_REPORTED_REJECTS = 1000
+
+
+def clean_complaint(data):
+    """Campos de una queja sin espacios sobrantes y la lista de errores de validación"""
+    values = {
+        'complaint_type': str(data.get('complaint_type') or '').strip(),
+        'category': str(data.get('category') or '').strip(),
+        'subject': str(data.get('subject') or '').strip(),
+        'description': str(data.get('description') or '').strip(),
+        'incident_date': str(data.get('incident_date') or '').strip() or None
+    }
+    errors = []
+    if not values['complaint_type']:
+        errors.append("El tipo de solicitud es requerido")
+    if not values['category']:
+        errors.append("La categoría es requerida")
+    if len(values['subject']) < SUBJECT_LENGTH[0]:
+        errors.append("El asunto es requerido (mínimo 5 caracteres)")
+    elif len(values['subject']) > SUBJECT_LENGTH[1]:
+        errors.append("El asunto no puede superar los 100 caracteres")
+    if len(values['description']) < DESCRIPTION_MIN_LENGTH:
+        errors.append("La descripción es requerida (mínimo 20 caracteres)")
+    if values['complaint_type'] not in COMPLAINT_TYPES:
+        errors.append("Tipo de solicitud no válido")
+    if values['category'] not in CATEGORIES:
+        errors.append("Categoría no válida")
+    if values['incident_date']:
+        try:
+            datetime.strptime(values['incident_date'], '%Y-%m-%d')
+        except ValueError:
+            errors.append("Fecha del incidente no válida (formato YYYY-MM-DD)")
+    return values, errors
+
+
+def read_rows(stream, fmt):
+    """Genera (número de línea, fila) de un stream binario CSV o JSONL sin cargarlo entero.
+
+    Una línea JSONL mal formada se genera como (número, None) para rechazarla.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Formato no soportado: {fmt} (csv o jsonl)")
+
+
+def parse_created_at(value):
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+
+class ImportReport:
+    """Progreso de una importación; se actualiza a medida que avanza"""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.rejects = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'line': line, 'errors': errors})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'rejects': self.rejects
+        }
+
+
+def import_complaints(repo, rows, batch_size=1000, commit_size=10000, on_reject=None, report=None):
+    """Valida e inserta quejas desde rows (iterable de (línea, fila)) con el Repository repo.
+
+    Cada fila identifica a su autor con user_email (usuario activo) y puede
+    traer status y created_at históricos. Las filas válidas se insertan con
+    executemany en lotes de batch_size y se confirman cada commit_size filas,
+    junto con los contadores de ticket_counters de esas filas; la memoria usada
+    no depende del tamaño del archivo. on_reject(línea, errores) se llama por
+    cada fila rechazada. Si algo falla se revierte lo no confirmado y se
+    relanza la excepción; report.inserted cuenta solo lo confirmado.
+    """
+    report = report or ImportReport()
+    user_ids = repo.active_user_ids()
+
+    batch = []
+    counter_deltas = {}
+    pending = 0
+
+    def flush(commit):
+        nonlocal pending
+        if batch:
+            repo.import_complaints(batch)
+            pending += len(batch)
+            batch.clear()
+        if commit and pending:
+            repo.add_counter_deltas([
+                (status, category, total) for (status, category), total in counter_deltas.items()
+            ])
+            repo.commit()
+            report.inserted += pending
+            pending = 0
+            counter_deltas.clear()
+
+    try:
+        for line, row in rows:
+            report.rows += 1
+            if row is None:
+                errors = ["Fila mal formada"]
+            else:
+                values, errors = clean_complaint(row)
+                user_id = user_ids.get(str(row.get('user_email') or '').strip().lower())
+                if user_id is None:
+                    errors.append("user_email no corresponde a un usuario activo")
+                status = str(row.get('status') or '').strip() or 'pendiente'
+                if status not in TICKET_STATUSES:
+                    errors.append("Estado no válido")
+                try:
+                    created_at = parse_created_at(str(row.get('created_at') or '').strip()) or datetime.now()
+                except ValueError:
+                    errors.append("created_at no válido (YYYY-MM-DD HH:MM:SS)")
+            if errors:
+                report.reject(line, errors)
+                if on_reject:
+                    on_reject(line, errors)
+                continue
+
+            batch.append((
+                user_id, values['complaint_type'], values['category'], values['subject'],
+                values['description'], values['incident_date'], status, created_at
+            ))
+            key = (status, values['category'])
+            counter_deltas[key] = counter_deltas.get(key, 0) + 1
+            if len(batch) >= batch_size:
+                flush(commit=pending + len(batch) >= commit_size)
+        flush(commit=True)
+    except Exception:
+        repo.rollback()
+        raise
+    finally:
+        report.elapsed = time.monotonic() - report.started
+    return report
@@ -0,0 +1,223 @@
+"""Prueba de carga contra una instancia en marcha de la aplicación.
+
+Cada hilo es un usuario virtual que inicia sesión y repite una mezcla de
+peticiones durante --duration segundos. Al final se muestra, por endpoint,
+el número de peticiones, errores, throughput y latencias p50/p95/p99.
+
+    python db.py seed --users 500 --complaints 100000
+    flask --app flaskr run --with-threads
+    python loadtest.py --concurrency 32 --duration 60
+
+Usa las cuentas que crea db.py seed (admin<i>@ / estudiante<i>@carga.utc.edu.mx).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+SYNTHETIC_DOMAIN = "carga.utc.edu.mx"
+SYNTHETIC_PASSWORD = "carga123"
+
+CATEGORIES = [
+    'servicios-academicos', 'infraestructura', 'servicios-estudiantiles',
+    'tecnologia', 'administrativo', 'biblioteca', 'cafeteria', 'otro'
+]
+
+# Mezcla de acciones por rol (pesos relativos)
+STUDENT_ACTIONS = {'tickets': 50, 'stats': 25, 'post': 25}
+ADMIN_ACTIONS = {'tickets': 45, 'stats': 25, 'resolve': 30}
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def multipart_body(fields, files):
+    """Cuerpo multipart/form-data; files es [(campo, nombre, tipo, contenido)]"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, content_type, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Results:
+    """Latencias por endpoint, compartidas entre hilos"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        rows = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(values),
+                'errors': self.errors.get(endpoint, 0),
+                'rps': round(len(values) / elapsed, 1),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 1)
+            })
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, base_url, email, password, role, results, rng):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.role = role
+        self.results = results
+        self.rng = rng
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+        self.ticket_ids = []
+
+    def request(self, endpoint, method, path, body=None, content_type=None):
+        """Hace la petición y registra su latencia; devuelve el JSON de la respuesta o None"""
+        request = Request(self.base_url + path, data=body, method=method)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                payload = response.read()
+            self.results.record(endpoint, time.perf_counter() - started, True)
+        except HTTPError as e:
+            e.read()
+            self.results.record(endpoint, time.perf_counter() - started, False)
+            return None
+        except URLError:
+            self.results.record(endpoint, time.perf_counter() - started, False)
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def login(self):
+        body = json.dumps({'email': self.email, 'password': self.password}).encode()
+        data = self.request('POST /login', 'POST', '/login', body, 'application/json')
+        return bool(data and data.get('success'))
+
+    def list_tickets(self):
+        path = '/api/tickets'
+        if self.rng.random() < 0.3:
+            path += f'?category={self.rng.choice(CATEGORIES)}'
+        data = self.request('GET /api/tickets', 'GET', path)
+        if data and data.get('success'):
+            self.ticket_ids = [ticket['id'] for ticket in data['tickets']] or self.ticket_ids
+
+    def stats(self):
+        self.request('GET /api/tickets/stats', 'GET', '/api/tickets/stats')
+
+    def post(self):
+        fields = {
+            'complaint_type': self.rng.choice(['queja', 'sugerencia', 'peticion']),
+            'category': self.rng.choice(CATEGORIES),
+            'subject': 'Prueba de carga del sistema',
+            'description': 'Queja generada por la prueba de carga para medir la latencia del alta.'
+        }
+        files = []
+        if self.rng.random() < 0.3:
+            files.append(('files', 'evidencia.txt', 'text/plain', uuid.uuid4().hex.encode() * 64))
+        body, content_type = multipart_body(fields, files)
+        self.request('POST /post', 'POST', '/post', body, content_type)
+
+    def resolve(self):
+        if not self.ticket_ids:
+            return self.list_tickets()
+        ticket_id = self.rng.choice(self.ticket_ids)
+        body, content_type = multipart_body({
+            'assigned_to': 'Prueba de carga',
+            'admin_response': 'Resuelto durante la prueba de carga.',
+            'status': self.rng.choice(['en-proceso', 'resuelto']),
+            'resolution_date': time.strftime('%Y-%m-%d'),
+            'time_spent': '1.5'
+        }, [])
+        self.request('POST /api/tickets/<id>/resolve', 'POST', f'/api/tickets/{ticket_id}/resolve', body, content_type)
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        actions = ADMIN_ACTIONS if self.role == 'admin' else STUDENT_ACTIONS
+        handlers = {'tickets': self.list_tickets, 'stats': self.stats, 'post': self.post, 'resolve': self.resolve}
+        names = list(actions)
+        weights = list(actions.values())
+        while time.monotonic() < deadline:
+            handlers[self.rng.choices(names, weights=weights)[0]]()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de las rutas principales")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help="segundos")
+    parser.add_argument('--admin-share', type=float, default=0.25, help="fracción de usuarios virtuales admin")
+    parser.add_argument('--students', type=int, default=100, help="cuentas de estudiante a rotar")
+    parser.add_argument('--admins', type=int, default=10, help="cuentas de admin a rotar (db.py seed crea usuarios/50)")
+    parser.add_argument('--password', default=SYNTHETIC_PASSWORD)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="imprime el resumen como JSON")
+    args = parser.parse_args()
+
+    results = Results()
+    rng = random.Random(args.seed)
+    admins = round(args.concurrency * args.admin_share)
+    users = []
+    for i in range(args.concurrency):
+        if i < admins:
+            # db.py seed numera primero a los admins (admin0, admin1, ...)
+            email, role = f"admin{i % args.admins}@{SYNTHETIC_DOMAIN}", 'admin'
+        else:
+            email, role = f"estudiante{args.admins + i % args.students}@{SYNTHETIC_DOMAIN}", 'student'
+        users.append(VirtualUser(args.base_url, email, args.password, role, results, random.Random(rng.random())))
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    rows = results.summary(elapsed)
+    if args.json:
+        print(json.dumps({'elapsed_seconds': round(elapsed, 1), 'concurrency': args.concurrency, 'endpoints': rows}))
+        return
+    print(f"{args.concurrency} usuarios virtuales durante {elapsed:.1f}s contra {args.base_url}")
+    print(f"{'endpoint':<32}{'peticiones':>11}{'errores':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for row in rows:
+        print(f"{row['endpoint']:<32}{row['requests']:>11}{row['errors']:>9}{row['rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+
+if __name__ == '__main__':
+    main()
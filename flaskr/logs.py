@@ -0,0 +1,117 @@
+"""Logging estructurado: una línea JSON por evento, escrita en segundo plano.
+
+Los registros se formatean en el hilo que los emite solo lo imprescindible
+(mensaje y traza) y pasan por una cola acotada a un QueueListener que los
+escribe en stderr; si la cola se llena se descartan y se cuentan, de modo
+que una petición nunca espera por la E/S del log. Los campos de extra=...
+y el request_id de la petición actual se añaden como claves del JSON.
+"""
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context
+
+# Atributos propios de LogRecord: el resto son campos de extra=...
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def request_id_from(header):
+    """El X-Request-ID recibido si es razonable; si no, uno nuevo"""
+    if header and REQUEST_ID_PATTERN.match(header):
+        return header
+    return uuid.uuid4().hex
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Añade el request_id de la petición en curso (se ejecuta en el hilo que emite)"""
+
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler que descarta (y cuenta) en lugar de bloquear si la cola está llena"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Se resuelven mensaje y traza aquí; los campos extra se conservan
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RouteSampler:
+    """Decide qué peticiones de las rutas más llamadas se registran.
+
+    rates es {regla de la ruta: fracción}; las rutas que no aparecen se
+    registran siempre.
+    """
+
+    def __init__(self, rates):
+        self.rates = dict(rates)
+
+    def sample(self, route):
+        rate = self.rates.get(route, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+def setup_logging(logger_name, level='INFO', queue_size=10000, stream=None):
+    """Configura el logger indicado con la cola y el formato JSON; devuelve
+    (handler, listener). El listener ya está arrancado."""
+    log_queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output, respect_handler_level=False)
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger(logger_name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return handler, listener
@@ -0,0 +1,139 @@
+"""Métricas de la aplicación en formato de texto de Prometheus.
+
+Registrar una observación solo suma en memoria (búsqueda binaria del bucket y
+un candado por métrica); el texto se genera únicamente cuando se consulta
+/metrics. Los valores son por proceso: con varios workers, Prometheus debe
+consultar cada uno.
+"""
+import threading
+from bisect import bisect_left
+
+# Límites superiores de los buckets en segundos (+Inf se añade al exportar)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+IMAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=""):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Histograma con etiquetas; observe(segundos, *valores de las etiquetas)"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Un contador por bucket (el último es +Inf) y la suma al final
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Contador con etiquetas; inc(*valores de las etiquetas, amount=1)"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métricas registradas y funciones que generan valores en el momento de la consulta"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() devuelve [(nombre, tipo, ayuda, [(etiquetas dict, valor)])]"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(labels, labels.values())} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    'http_request_duration_seconds', "Duración de las peticiones por ruta",
+    ('method', 'route', 'status')
+))
+QUERY_SECONDS = registry.register(Histogram(
+    'db_query_duration_seconds', "Duración de las consultas por nombre lógico del repositorio",
+    ('query', 'outcome')
+))
+DB_ACQUIRE_SECONDS = registry.register(Histogram(
+    'db_pool_acquire_seconds', "Espera para obtener una conexión del pool"
+))
+IMAGE_PROCESSING_SECONDS = registry.register(Histogram(
+    'image_processing_seconds', "Generación de los derivados de una imagen (tiempo en el proceso del pool)",
+    ('file_type',), buckets=IMAGE_BUCKETS
+))
+IMAGE_PROCESSING_FAILURES = registry.register(Counter(
+    'image_processing_failures_total', "Imágenes cuyo procesamiento falló", ('file_type',)
+))
+PASSWORD_HASH_SECONDS = registry.register(Histogram(
+    'password_hash_seconds', "Comprobación de contraseña en el inicio de sesión (KDF y espera en el pool)"
+))
+PASSWORD_HASHER_BUSY = registry.register(Counter(
+    'password_hasher_busy_total', "Inicios de sesión rechazados porque el pool del KDF estaba lleno"
+))
@@ -0,0 +1,152 @@
+"""Hash de contraseñas con scrypt (memory-hard, incluido en hashlib).
+
+Formato guardado en users.password:
+
+    scrypt$<n>$<r>$<p>$<sal base64>$<hash base64>
+
+Los parámetros viajan con cada hash, así que se pueden endurecer sin
+invalidar los existentes: needs_rehash() detecta los que usan otros
+parámetros (o siguen en texto plano) para rehacerlos al iniciar sesión.
+
+Sin importaciones relativas: db.py lo usa como script desde esta carpeta.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PREFIX = "scrypt"
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Coste por defecto: n=2^14, r=8 -> 16 MiB y unos 40-60 ms por hash en un núcleo
+DEFAULT_PARAMS = {'n': 2 ** 14, 'r': 8, 'p': 1}
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+# hashlib.scrypt no acepta maxmem por encima de INT_MAX
+MAX_MEMORY = 2 ** 31 - 1
+
+
+def scrypt_memory(n, r, p):
+    """Bytes que necesita scrypt con estos parámetros"""
+    return 128 * r * (n + p)
+
+
+def _scrypt(password, salt, n, r, p):
+    if scrypt_memory(n, r, p) > MAX_MEMORY:
+        raise ValueError(f"scrypt con n={n}, r={r}, p={p} necesita más de {MAX_MEMORY} bytes")
+    # maxmem con holgura sobre la memoria necesaria, sin pasar del máximo de hashlib
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=min(256 * r * n + 1024 * 1024, MAX_MEMORY), dklen=HASH_BYTES)
+
+
+def hash_password(password, params=DEFAULT_PARAMS):
+    salt = os.urandom(SALT_BYTES)
+    n, r, p = params['n'], params['r'], params['p']
+    return f"{PREFIX}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def parse_hash(stored):
+    """(n, r, p, sal, hash) de un hash guardado, o None si no tiene el formato (texto plano)"""
+    parts = stored.split('$')
+    if len(parts) != 6 or parts[0] != PREFIX:
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3]), base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def verify_password(password, stored):
+    """Comprueba la contraseña en tiempo constante respecto al hash guardado.
+
+    Acepta contraseñas antiguas en texto plano para poder migrarlas al
+    iniciar sesión (ver needs_rehash).
+    """
+    parsed = parse_hash(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+    n, r, p, salt, expected = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), expected)
+
+
+def needs_rehash(stored, params=DEFAULT_PARAMS):
+    parsed = parse_hash(stored)
+    return parsed is None or parsed[:3] != (params['n'], params['r'], params['p'])
+
+
+def calibrate(target_per_second, r=8, p=1, max_log_n=20, samples=3):
+    """Mide el coste de scrypt con n = 2^10 .. 2^max_log_n en este núcleo.
+
+    Devuelve ([(n, ms por hash, inicios de sesión/s por núcleo)], parámetros
+    recomendados): el n más alto que aún permite target_per_second.
+    """
+    results = []
+    recommended = {'n': 2 ** 10, 'r': r, 'p': p}
+    for log_n in range(10, max_log_n + 1):
+        n = 2 ** log_n
+        if scrypt_memory(n, r, p) > MAX_MEMORY:
+            break
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            _scrypt("calibracion", b"\0" * SALT_BYTES, n, r, p)
+            timings.append(time.perf_counter() - started)
+        seconds = min(timings)
+        per_second = 1 / seconds
+        results.append((n, seconds * 1000, per_second))
+        if per_second < target_per_second:
+            break
+        recommended = {'n': n, 'r': r, 'p': p}
+    return results, recommended
+
+
+class HasherBusy(Exception):
+    """Hay demasiadas comprobaciones de contraseña esperando"""
+
+
+class PasswordHasher:
+    """Ejecuta el KDF en un pool acotado de hilos (hashlib.scrypt libera el GIL).
+
+    - workers: hilos que calculan hashes a la vez (uno por núcleo dedicado)
+    - max_pending: comprobaciones admitidas entre en curso y en espera; por
+      encima se lanza HasherBusy al momento en lugar de encolar, para que una
+      ráfaga de inicios de sesión no acapare los hilos del servidor
+    """
+
+    def __init__(self, params=DEFAULT_PARAMS, workers=2, max_pending=16):
+        self.params = dict(params)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kdf")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Hash de referencia para gastar el mismo tiempo cuando el email no existe
+        self._dummy_hash = hash_password("", self.params)
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Demasiados inicios de sesión en curso")
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def verify(self, password, stored):
+        """True si la contraseña corresponde; stored None (usuario inexistente) cuesta lo mismo"""
+        if stored is None:
+            self._run(verify_password, password, self._dummy_hash)
+            return False
+        return self._run(verify_password, password, stored)
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.params)
+
+    def needs_rehash(self, stored):
+        return needs_rehash(stored, self.params)
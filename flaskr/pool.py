@@ -0,0 +1,155 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No se pudo obtener una conexión del pool dentro del tiempo límite"""
+
+
+class PooledConnection:
+    """Envoltura de una conexión del pool.
+
+    Delegamos todo a la conexión real excepto close(): la conexión se
+    devuelve al pool al terminar la petición (teardown), no al cerrarla.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.last_used = time.monotonic()
+        # Cursores preparados por sentencia SQL (los gestiona Repository); viven
+        # tanto como la conexión real y se descartan con ella
+        self.cursors = {}
+
+    def close(self):
+        # La conexión vuelve al pool en el teardown de la petición
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones a MariaDB, seguro entre hilos.
+
+    - size: número máximo de conexiones abiertas a la vez
+    - timeout: segundos que se espera por una conexión libre
+    - ping_interval: segundos de inactividad tras los cuales se hace ping
+      a la conexión antes de prestarla
+    - on_checkout: función opcional que recibe los segundos de espera de
+      cada conexión prestada (métricas)
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, ping_interval=30.0, on_checkout=None):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.on_checkout = on_checkout
+        self._idle = []
+        self._opened = 0
+        self._cond = threading.Condition()
+        # Métricas
+        self._in_use = 0
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._health_check_failures = 0
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    # Reservamos el hueco y conectamos fuera del candado
+                    self._opened += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._checkout_failures += 1
+                    raise PoolTimeout(f"Sin conexiones libres tras {self.timeout}s")
+                self._cond.wait(remaining)
+
+        try:
+            if conn is not None and not self._is_healthy(conn):
+                self._discard_raw(conn._raw)
+                conn = None
+                with self._cond:
+                    self._opened += 1
+            if conn is None:
+                conn = PooledConnection(self, self._connect())
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._checkout_failures += 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if self.on_checkout is not None:
+            self.on_checkout(waited)
+        return conn
+
+    def release(self, conn):
+        """Devuelve la conexión al pool descartando cualquier transacción abierta"""
+        try:
+            conn._raw.rollback()
+            conn.last_used = time.monotonic()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(conn)
+            else:
+                self._opened -= 1
+            self._cond.notify()
+
+        if not healthy:
+            self._discard_raw(conn._raw)
+
+    def _is_healthy(self, conn):
+        if time.monotonic() - conn.last_used < self.ping_interval:
+            return True
+        try:
+            conn._raw.ping()
+            return True
+        except Exception:
+            with self._cond:
+                self._health_check_failures += 1
+                self._opened -= 1
+            return False
+
+    @staticmethod
+    def _discard_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'opened': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'checkout_failures': self._checkout_failures,
+                'health_check_failures': self._health_check_failures,
+                'wait_avg_ms': round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
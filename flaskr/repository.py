@@ -0,0 +1,588 @@
+"""Acceso a datos: todas las consultas de la aplicación viven aquí.
+
+Repository envuelve una conexión del pool. Cada sentencia se ejecuta con un
+cursor preparado que se guarda en la conexión (PooledConnection.cursors) y se
+reutiliza en las siguientes peticiones que la reciban, así que MariaDB solo
+analiza cada SQL una vez por conexión. Las consultas devuelven filas con
+nombre (namedtuple o las filas de serializers) y registran su duración en
+query_stats con un nombre lógico ("tickets.list", "blobs.register", ...).
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import mariadb
+
+from .images import IMAGE_EXTENSIONS
+from .metrics import QUERY_SECONDS
+from .schema import COMPLAINT_TYPES, TICKET_STATUSES
+from .serializers import CATEGORY_NAMES, TicketDetailRow, TicketListRow, TicketSearchRow
+
+# Cursores preparados que se guardan por conexión; al superarlo se cierra el
+# menos usado recientemente (los IN (?, ?, ...) de tamaño variable generan
+# sentencias distintas)
+MAX_CACHED_STATEMENTS = 64
+
+User = namedtuple('User', 'id email password user_code role name last_name study_area study_speciality term')
+Profile = namedtuple('Profile', 'name last_name email study_area study_speciality term personal_description')
+Blob = namedtuple('Blob', 'sha256 file_path file_type file_size processing_status thumb_path medium_path')
+TicketCounter = namedtuple('TicketCounter', 'status category total')
+LockedTicket = namedtuple('LockedTicket', 'status category')
+
+
+class QueryStats:
+    """Número de ejecuciones, errores y tiempos por consulta, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries = {}
+
+    def record(self, name, seconds, failed=False):
+        with self._lock:
+            entry = self._queries.get(name)
+            if entry is None:
+                # [ejecuciones, errores, segundos totales, máximo]
+                entry = self._queries[name] = [0, 0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += failed
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+
+    def snapshot(self):
+        """Estadísticas por consulta, de mayor a menor tiempo total"""
+        with self._lock:
+            items = sorted(self._queries.items(), key=lambda item: item[1][2], reverse=True)
+            return {
+                name: {
+                    'calls': calls,
+                    'errors': errors,
+                    'total_ms': round(total * 1000, 3),
+                    'avg_ms': round(total / calls * 1000, 3),
+                    'max_ms': round(maximum * 1000, 3)
+                }
+                for name, (calls, errors, total, maximum) in items
+            }
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+
+
+query_stats = QueryStats()
+
+# Filtros combinables del listado: parámetro de la query string -> (columna, valores válidos).
+# Cada columna tiene un índice compuesto (columna, created_at) en db.py
+TICKET_FILTERS = {
+    'status': ('c.status', TICKET_STATUSES),
+    'category': ('c.category', tuple(CATEGORY_NAMES)),
+    'complaint_type': ('c.complaint_type', COMPLAINT_TYPES)
+}
+
+
+def filters_condition(filters):
+    """Condición SQL parametrizada (AND ...) de los filtros del listado"""
+    sql = ""
+    params = ()
+    for name, (column, _) in TICKET_FILTERS.items():
+        values = filters.get(name)
+        if not values:
+            continue
+        if len(values) == 1:
+            sql += f" AND {column} = ?"
+        else:
+            sql += f" AND {column} IN ({', '.join('?' * len(values))})"
+        params += values
+    if 'user_id' in filters:
+        sql += " AND c.user_id = ?"
+        params += (filters['user_id'],)
+    if 'from' in filters:
+        sql += " AND c.created_at >= ?"
+        params += (filters['from'],)
+    if 'to' in filters:
+        sql += " AND c.created_at < ?"
+        params += (filters['to'] + timedelta(days=1),)
+    return sql, params
+
+
+def keyset_condition(after):
+    """Condición SQL para continuar después del último (created_at, id) visto"""
+    if not after:
+        return "", ()
+    created_at, ticket_id = after
+    return " AND (c.created_at < ? OR (c.created_at = ? AND c.id < ?))", (created_at, created_at, ticket_id)
+
+
+# Primera imagen del usuario y del admin de cada ticket, resueltas en la misma
+# consulta del listado (una subconsulta indexada por complaint_id por fila)
+# en lugar de dos consultas extra por ticket. Se usa el derivado indicado
+# (thumb_path o medium_path) y el original mientras no se haya generado.
+def first_images_columns(derivative):
+    return f"""
+                   (SELECT COALESCE(ca.{derivative}, ca.file_path) FROM complaint_attachments ca
+                    WHERE ca.complaint_id = c.id AND ca.file_type IN ('jpg','jpeg','png','gif')
+                    ORDER BY ca.id ASC LIMIT 1) AS user_image,
+                   (SELECT COALESCE(ri.{derivative}, ri.file_path) FROM resolution_images ri
+                    WHERE ri.complaint_id = c.id AND ri.file_type IN ('jpg','jpeg','png','gif')
+                    ORDER BY ri.id ASC LIMIT 1) AS admin_image"""
+
+
+# Listados: miniatura; detalle: imagen mediana
+FIRST_IMAGES_COLUMNS = first_images_columns('thumb_path')
+DETAIL_IMAGES_COLUMNS = first_images_columns('medium_path')
+
+
+def tickets_list_query(conditions_sql, paged=True):
+    """Consulta del listado: datos del ticket junto con su primera imagen de usuario y de admin"""
+    return f"""
+        SELECT {TicketListRow.COLUMNS},
+               {FIRST_IMAGES_COLUMNS}
+        FROM complaints c
+        INNER JOIN users u ON c.user_id = u.id
+        WHERE u.is_active = TRUE{conditions_sql}
+        ORDER BY c.created_at DESC, c.id DESC{" LIMIT ?" if paged else ""}
+    """
+
+
+TICKET_DETAIL_QUERY = f"""
+    SELECT {TicketDetailRow.COLUMNS}
+    FROM complaints c
+    INNER JOIN users u ON c.user_id = u.id
+    LEFT JOIN complaint_responses cr ON c.id = cr.complaint_id
+    WHERE c.id = ?
+"""
+
+TICKET_DETAIL_WITH_IMAGES_QUERY = f"""
+    SELECT {TicketDetailRow.COLUMNS},
+           {DETAIL_IMAGES_COLUMNS}
+    FROM complaints c
+    INNER JOIN users u ON c.user_id = u.id
+    LEFT JOIN complaint_responses cr ON c.id = cr.complaint_id
+    WHERE c.id = ?
+"""
+
+# Una sola respuesta por ticket (UNIQUE complaint_id): se crea o se actualiza
+# en la misma sentencia, sin consultar antes si existe
+SAVE_RESPONSE = """
+    INSERT INTO complaint_responses (
+        complaint_id, assigned_to, admin_response, resolution_date, time_spent
+    ) VALUES (?, ?, ?, ?, ?)
+    ON DUPLICATE KEY UPDATE
+        assigned_to = VALUES(assigned_to),
+        admin_response = VALUES(admin_response),
+        resolution_date = VALUES(resolution_date),
+        time_spent = VALUES(time_spent)
+"""
+
+SET_TICKET_STATUS = "UPDATE complaints SET status = ?, updated_at = CURRENT_TIMESTAMP(6) WHERE id = ?"
+
+INCREMENT_COUNTERS = """
+    INSERT INTO ticket_counters (status, category, total) VALUES (?, ?, ?)
+    ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+"""
+
+# Importación: conserva el estado y la fecha de creación históricos
+IMPORT_COMPLAINT = """
+    INSERT INTO complaints (
+        user_id, complaint_type, category, subject, description,
+        incident_date, status, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class Repository:
+    """Consultas de la aplicación sobre una conexión del pool.
+
+    No confirma nada por su cuenta: quien la usa decide cuándo llamar a
+    commit() o rollback(), así que varias operaciones pueden formar una sola
+    transacción.
+    """
+
+    def __init__(self, conn, stats=query_stats):
+        self.conn = conn
+        self.stats = stats
+
+    def _cursor(self, sql):
+        """Cursor preparado de la sentencia, reutilizado mientras viva la conexión"""
+        cursors = self.conn.cursors
+        cur = cursors.pop(sql, None)
+        if cur is None:
+            if len(cursors) >= MAX_CACHED_STATEMENTS:
+                cursors.pop(next(iter(cursors))).close()
+            cur = self.conn.cursor(prepared=True)
+        # El último usado queda al final: el primero es el candidato a cerrarse
+        cursors[sql] = cur
+        return cur
+
+    def _execute(self, name, sql, params=(), many=False, cursor=None):
+        """Ejecuta sql con el cursor preparado de la sentencia y registra su duración.
+
+        cursor: cursor propio para las sentencias que no deben guardarse en la
+        conexión (sin buffer o sin preparar); lo cierra quien lo abre.
+        """
+        cur = cursor or self._cursor(sql)
+        started = time.perf_counter()
+        try:
+            if many:
+                cur.executemany(sql, params)
+            else:
+                cur.execute(sql, params)
+        except mariadb.Error:
+            self._record(name, started, failed=True)
+            raise
+        self._record(name, started)
+        return cur
+
+    def _record(self, name, started, failed=False):
+        seconds = time.perf_counter() - started
+        self.stats.record(name, seconds, failed)
+        QUERY_SECONDS.observe(seconds, name, 'error' if failed else 'ok')
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    # ---------- Usuarios ----------
+
+    def user_by_email(self, email):
+        """Usuario activo con su hash de contraseña (la comprobación se hace fuera de SQL)"""
+        cur = self._execute('users.by_email', """
+            SELECT id, email, password, user_id, role, name, last_name, study_area, study_speciality, term
+            FROM users WHERE email = ? AND is_active = TRUE
+        """, (email,))
+        row = cur.fetchone()
+        return User(*row) if row else None
+
+    def update_password_hash(self, user_id, password_hash):
+        # updated_at se conserva: la contraseña no aparece en listados ni detalles
+        # y cambiarla invalidaría los ETags de todos los listados
+        self._execute('users.update_password', "UPDATE users SET password = ?, updated_at = updated_at WHERE id = ?",
+                      (password_hash, user_id))
+
+    def active_user_ids(self):
+        """{email en minúsculas: id} de los usuarios activos (autores de la importación)"""
+        cur = self._execute('users.active_ids', "SELECT email, id FROM users WHERE is_active = TRUE")
+        return {email.lower(): user_id for email, user_id in cur.fetchall()}
+
+    def profile(self, user_id):
+        cur = self._execute('users.profile', """
+            SELECT name, last_name, email, study_area, study_speciality, term, personal_description
+            FROM users WHERE id = ?
+        """, (user_id,))
+        row = cur.fetchone()
+        return Profile(*row) if row else None
+
+    def update_profile(self, user_id, profile, initials):
+        self._execute('users.update_profile', """
+            UPDATE users SET
+                name = ?, last_name = ?, email = ?,
+                study_area = ?, study_speciality = ?,
+                term = ?, personal_description = ?,
+                avatar_initials = ?
+            WHERE id = ?
+        """, (*profile, initials, user_id))
+
+    # ---------- Lectura de tickets ----------
+
+    def tickets_version(self, filters=None):
+        """Sello de versión barato de un listado: número de tickets, última modificación
+        de tickets y última modificación de usuarios (nombres e iniciales del listado)"""
+        filters_sql, filters_params = filters_condition(filters or {})
+        cur = self._execute('tickets.version', f"""
+            SELECT COUNT(*), MAX(c.updated_at), (SELECT MAX(updated_at) FROM users)
+            FROM complaints c WHERE 1 = 1{filters_sql}
+        """, filters_params)
+        return tuple(cur.fetchone())
+
+    def list_tickets(self, filters, limit, after=None):
+        """Hasta limit tickets con los filtros dados, después del (created_at, id) after"""
+        filters_sql, filters_params = filters_condition(filters)
+        after_sql, after_params = keyset_condition(after)
+        cur = self._execute('tickets.list', tickets_list_query(filters_sql + after_sql),
+                            filters_params + after_params + (limit,))
+        return [TicketListRow(row) for row in cur.fetchall()]
+
+    def iter_tickets(self, batch_size, filters=None):
+        """Genera lotes de TicketListRow de los tickets que cumplen los filtros (todos
+        si no hay) sin cargar la tabla en memoria.
+
+        Usa un cursor sin buffer y sin preparar (las filas se leen del servidor a
+        medida que se piden), que no se guarda en la conexión; el tiempo
+        registrado es solo el de la ejecución.
+        """
+        filters_sql, filters_params = filters_condition(filters or {})
+        cur = self.conn.cursor(buffered=False)
+        try:
+            self._execute('tickets.export', tickets_list_query(filters_sql, paged=False),
+                          filters_params, cursor=cur)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [TicketListRow(row) for row in rows]
+        finally:
+            cur.close()
+
+    def explain_tickets_list(self, filters, limit):
+        """Plan de la consulta del listado (filas de EXPLAIN como dicts)"""
+        filters_sql, filters_params = filters_condition(filters)
+        # Sin preparar: EXPLAIN se ejecuta una sola vez por combinación de filtros
+        cur = self.conn.cursor()
+        try:
+            self._execute('tickets.explain', "EXPLAIN " + tickets_list_query(filters_sql),
+                          filters_params + (limit,), cursor=cur)
+            columns = [column[0] for column in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def search_tickets(self, match_query, filters, limit, offset):
+        """Tickets que contienen todas las palabras, ordenados por relevancia"""
+        filters_sql, filters_params = filters_condition(filters)
+        # La condición MATCH se resuelve con el índice FULLTEXT; la relevancia
+        # calculada en el SELECT reutiliza la misma búsqueda
+        cur = self._execute('tickets.search', f"""
+            SELECT {TicketListRow.COLUMNS},
+                   {FIRST_IMAGES_COLUMNS},
+                   MATCH(c.subject, c.description) AGAINST (? IN BOOLEAN MODE) AS score
+            FROM complaints c
+            INNER JOIN users u ON c.user_id = u.id
+            WHERE MATCH(c.subject, c.description) AGAINST (? IN BOOLEAN MODE)
+                  AND u.is_active = TRUE{filters_sql}
+            ORDER BY score DESC, c.id DESC
+            LIMIT ? OFFSET ?
+        """, (match_query, match_query) + filters_params + (limit, offset))
+        return [TicketSearchRow(row) for row in cur.fetchall()]
+
+    def ticket_counters(self):
+        """Contadores materializados (una fila por estado y categoría)"""
+        cur = self._execute('tickets.counters', "SELECT status, category, total FROM ticket_counters WHERE total > 0")
+        return [TicketCounter(*row) for row in cur.fetchall()]
+
+    def ticket_version(self, ticket_id):
+        """Sello de versión del detalle: resolve_ticket() actualiza complaints.updated_at
+        en cada resolución; () si el ticket no existe"""
+        cur = self._execute('tickets.detail_version', """
+            SELECT c.updated_at, u.updated_at
+            FROM complaints c
+            INNER JOIN users u ON c.user_id = u.id
+            WHERE c.id = ?
+        """, (ticket_id,))
+        return tuple(cur.fetchone() or ())
+
+    def ticket_detail(self, ticket_id, images=False):
+        """Ticket con su autor y la respuesta del admin (y sus imágenes medianas si images)"""
+        if images:
+            cur = self._execute('tickets.detail_with_images', TICKET_DETAIL_WITH_IMAGES_QUERY, (ticket_id,))
+        else:
+            cur = self._execute('tickets.detail', TICKET_DETAIL_QUERY, (ticket_id,))
+        row = cur.fetchone()
+        return TicketDetailRow(row) if row else None
+
+    def count_complaints(self):
+        return self._execute('tickets.count', "SELECT COUNT(*) FROM complaints").fetchone()[0]
+
+    def last_ticket_id(self):
+        return self._execute('tickets.last_id', "SELECT COALESCE(MAX(id), 0) FROM complaints").fetchone()[0]
+
+    # ---------- Escritura de tickets ----------
+
+    def create_complaint(self, user_id, complaint_type, category, subject, description, incident_date):
+        """Inserta una queja pendiente; devuelve su id"""
+        cur = self._execute('tickets.create', """
+            INSERT INTO complaints (
+                user_id, complaint_type, category,
+                subject, description, incident_date, status
+            ) VALUES (?, ?, ?, ?, ?, ?, 'pendiente')
+        """, (user_id, complaint_type, category, subject, description, incident_date))
+        return cur.lastrowid
+
+    def import_complaints(self, rows):
+        """Inserta de una vez filas (user_id, tipo, categoría, asunto, descripción,
+        fecha del incidente, estado, created_at) ya validadas"""
+        self._execute('tickets.import', IMPORT_COMPLAINT, rows, many=True)
+
+    def add_counter_deltas(self, deltas):
+        """Suma (estado, categoría, delta) a ticket_counters; deltas no puede estar vacío.
+
+        Las filas se bloquean siempre en orden de (estado, categoría): dos
+        transacciones que mueven contadores en sentidos opuestos esperan una a
+        la otra en lugar de bloquearse mutuamente (error 1213).
+        """
+        self._execute('counters.add', INCREMENT_COUNTERS, sorted(deltas), many=True)
+
+    def increment_ticket_counter(self, status, category, amount=1):
+        self._execute('counters.increment', INCREMENT_COUNTERS, (status, category, amount))
+
+    def move_ticket_counter(self, ticket_id, new_status):
+        """Bloquea el ticket y mueve su contador al nuevo estado dentro de la transacción actual.
+
+        Devuelve LockedTicket con el estado anterior y la categoría, o None si el
+        ticket no existe.
+        """
+        cur = self._execute('tickets.lock', "SELECT status, category FROM complaints WHERE id = ? FOR UPDATE",
+                            (ticket_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        previous = LockedTicket(*row)
+        if previous.status != new_status:
+            # Ambos contadores en una sola sentencia, en el mismo orden global que
+            # add_counter_deltas para no bloquearse con un movimiento inverso
+            rows = sorted([(previous.status, previous.category, -1), (new_status, previous.category, 1)])
+            self._execute('counters.move', """
+                INSERT INTO ticket_counters (status, category, total) VALUES (?, ?, ?), (?, ?, ?)
+                ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+            """, rows[0] + rows[1])
+        return previous
+
+    def lock_tickets(self, ticket_ids):
+        """Bloquea los tickets existentes de una vez (en orden de id); devuelve {id: LockedTicket}"""
+        placeholders = ', '.join('?' * len(ticket_ids))
+        cur = self._execute('tickets.lock_many',
+                            f"SELECT id, status, category FROM complaints WHERE id IN ({placeholders}) FOR UPDATE",
+                            tuple(ticket_ids))
+        return {row[0]: LockedTicket(row[1], row[2]) for row in cur.fetchall()}
+
+    def set_ticket_status(self, ticket_id, status):
+        self._execute('tickets.set_status', SET_TICKET_STATUS, (status, ticket_id))
+
+    def set_tickets_status(self, ticket_ids, status):
+        self._execute('tickets.set_status_many', SET_TICKET_STATUS,
+                      [(status, ticket_id) for ticket_id in ticket_ids], many=True)
+
+    def save_response(self, ticket_id, resolution):
+        self._execute('responses.save', SAVE_RESPONSE, (
+            ticket_id,
+            resolution['assigned_to'],
+            resolution['admin_response'],
+            resolution['resolution_date'],
+            resolution['time_spent']
+        ))
+
+    def save_responses(self, ticket_ids, resolution):
+        self._execute('responses.save_many', SAVE_RESPONSE, [(
+            ticket_id,
+            resolution['assigned_to'],
+            resolution['admin_response'],
+            resolution['resolution_date'],
+            resolution['time_spent']
+        ) for ticket_id in ticket_ids], many=True)
+
+    def delete_tickets_after(self, last_id):
+        """Borra los tickets con id mayor que last_id (datos del benchmark) junto con
+        sus adjuntos y respuestas, y los descuenta de ticket_counters; devuelve cuántos"""
+        cur = self._execute('tickets.lock_after', """
+            SELECT status, category, COUNT(*) FROM complaints WHERE id > ?
+            GROUP BY status, category FOR UPDATE
+        """, (last_id,))
+        deltas = [(status, category, -total) for status, category, total in cur.fetchall()]
+        if not deltas:
+            return 0
+        self.add_counter_deltas(deltas)
+        cur = self._execute('tickets.delete_after', "DELETE FROM complaints WHERE id > ?", (last_id,))
+        return cur.rowcount
+
+    # ---------- Blobs y adjuntos ----------
+
+    def register_blob(self, sha256, file_path, file_type, file_size):
+        """Registra un blob (o suma una referencia si ya existía) en la transacción actual.
+
+        Devuelve (Blob, creado): los datos vigentes del blob, incluido su estado de
+        procesamiento, y si esta llamada lo ha creado.
+        """
+        processing_status = 'pending' if file_type in IMAGE_EXTENSIONS else 'ready'
+        cur = self._execute('blobs.register', """
+            INSERT INTO blobs (sha256, file_path, file_type, file_size, processing_status, ref_count)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+        """, (sha256, file_path, file_type, file_size, processing_status))
+        if cur.rowcount == 1:
+            # Recién insertado: sus datos son exactamente los que acabamos de escribir
+            return Blob(sha256, file_path, file_type, file_size, processing_status, None, None), True
+        cur = self._execute('blobs.lock', """
+            SELECT file_path, file_type, file_size, processing_status, thumb_path, medium_path
+            FROM blobs WHERE sha256 = ? FOR UPDATE
+        """, (sha256,))
+        return Blob(sha256, *cur.fetchone()), False
+
+    def add_attachment(self, complaint_id, original_filename, saved_filename, blob):
+        self._execute('attachments.add', """
+            INSERT INTO complaint_attachments (
+                complaint_id, original_filename, saved_filename,
+                file_path, file_size, file_type,
+                processing_status, thumb_path, medium_path, sha256
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            complaint_id, original_filename, saved_filename,
+            blob.file_path, blob.file_size, blob.file_type,
+            blob.processing_status, blob.thumb_path, blob.medium_path, blob.sha256
+        ))
+
+    def add_resolution_image(self, complaint_id, saved_filename, blob):
+        self._execute('resolution_images.add', """
+            INSERT INTO resolution_images (
+                complaint_id, saved_filename, file_path, file_type, file_size,
+                processing_status, thumb_path, medium_path, sha256
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            complaint_id, saved_filename, blob.file_path, blob.file_type, blob.file_size,
+            blob.processing_status, blob.thumb_path, blob.medium_path, blob.sha256
+        ))
+
+    def finish_blob_processing(self, sha256, status, thumb_path, medium_path):
+        """Guarda el resultado del procesamiento en el blob y en todos los adjuntos que lo referencian"""
+        params = (status, thumb_path, medium_path, sha256)
+        for table in ("blobs", "complaint_attachments", "resolution_images"):
+            self._execute(f'{table}.processed', f"""
+                UPDATE {table}
+                SET processing_status = ?, thumb_path = ?, medium_path = ?
+                WHERE sha256 = ?
+            """, params)
+        # Cambia la versión de los tickets para que ETags y caché recojan los derivados
+        self._execute('tickets.touch_by_blob', """
+            UPDATE complaints SET updated_at = CURRENT_TIMESTAMP(6)
+            WHERE id IN (
+                SELECT complaint_id FROM complaint_attachments WHERE sha256 = ?
+                UNION
+                SELECT complaint_id FROM resolution_images WHERE sha256 = ?
+            )
+        """, (sha256, sha256))
+
+    def recount_blob_refs(self):
+        self._execute('blobs.recount', """
+            UPDATE blobs b SET ref_count =
+                (SELECT COUNT(*) FROM complaint_attachments ca WHERE ca.sha256 = b.sha256) +
+                (SELECT COUNT(*) FROM resolution_images ri WHERE ri.sha256 = b.sha256)
+        """)
+
+    def blobs_of_tickets_after(self, last_id):
+        """Blobs adjuntos a los tickets con id mayor que last_id como
+        (sha256, file_path, thumb_path, medium_path)"""
+        cur = self._execute('blobs.of_tickets_after', """
+            SELECT sha256, file_path, thumb_path, medium_path FROM blobs
+            WHERE sha256 IN (
+                SELECT sha256 FROM complaint_attachments WHERE complaint_id > ?
+                UNION
+                SELECT sha256 FROM resolution_images WHERE complaint_id > ?
+            )
+        """, (last_id, last_id))
+        return cur.fetchall()
+
+    def unreferenced_blobs(self):
+        """Blobs sin referencias como (sha256, file_path, thumb_path, medium_path)"""
+        cur = self._execute('blobs.unreferenced',
+                            "SELECT sha256, file_path, thumb_path, medium_path FROM blobs WHERE ref_count = 0")
+        return cur.fetchall()
+
+    def delete_unreferenced_blob(self, sha256):
+        """Borra el blob si sigue sin referencias; devuelve si se borró"""
+        cur = self._execute('blobs.delete', "DELETE FROM blobs WHERE sha256 = ? AND ref_count = 0", (sha256,))
+        return cur.rowcount > 0
+
+    def blob_paths(self):
+        """Rutas relativas (original y derivados) de todos los blobs registrados"""
+        cur = self._execute('blobs.paths', "SELECT file_path, thumb_path, medium_path FROM blobs")
+        return [path for row in cur.fetchall() for path in row if path]
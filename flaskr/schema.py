@@ -0,0 +1,11 @@
+"""Valores de las columnas ENUM de complaints (ver MIGRATIONS en db.py).
+
+Los comparten la validación de /post y de la importación, los filtros de los
+listados y el repositorio.
+"""
+COMPLAINT_TYPES = ('queja', 'sugerencia', 'peticion')
+CATEGORIES = (
+    'servicios-academicos', 'infraestructura', 'servicios-estudiantiles',
+    'tecnologia', 'administrativo', 'biblioteca', 'cafeteria', 'otro'
+)
+TICKET_STATUSES = ('pendiente', 'en-proceso', 'resuelto', 'escalado')
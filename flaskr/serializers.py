@@ -0,0 +1,154 @@
+import json
+from datetime import date, datetime
+
+try:
+    # Codificador JSON más rápido si está instalado; si no, se usa json de la stdlib
+    import orjson
+except ImportError:
+    orjson = None
+
+CATEGORY_NAMES = {
+    'servicios-academicos': 'Servicios Académicos',
+    'infraestructura': 'Infraestructura',
+    'servicios-estudiantiles': 'Servicios Estudiantiles',
+    'tecnologia': 'Tecnología',
+    'administrativo': 'Administrativo',
+    'biblioteca': 'Biblioteca',
+    'cafeteria': 'Cafetería',
+    'otro': 'Otro'
+}
+
+
+def category_name(category):
+    return CATEGORY_NAMES.get(category) or category.title()
+
+
+def format_date(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def format_datetime(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    return value or ""
+
+
+def dumps(payload):
+    """JSON compacto en una cadena; las fechas que queden se codifican en ISO"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str).decode()
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class TicketListRow:
+    """Fila del listado de tickets (columnas de COLUMNS más las dos imágenes)"""
+
+    COLUMNS = """c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date,
+               c.status, c.created_at, u.name, u.last_name, u.avatar_initials"""
+
+    __slots__ = (
+        'id', 'complaint_type', 'category', 'subject', 'description', 'incident_date',
+        'status', 'created_at', 'user_name', 'user_last_name', 'avatar_initials',
+        'user_image', 'admin_image'
+    )
+
+    def __init__(self, row):
+        (self.id, self.complaint_type, self.category, self.subject, self.description,
+         self.incident_date, self.status, self.created_at, self.user_name,
+         self.user_last_name, self.avatar_initials, self.user_image, self.admin_image) = row[:13]
+
+    def to_dict(self):
+        # Una sola conversión de created_at por fila; "date" es su prefijo
+        created_at = format_datetime(self.created_at)
+        return {
+            'id': self.id,
+            'complaint_type': self.complaint_type,
+            'category': self.category,
+            'categoryName': category_name(self.category),
+            'title': self.subject,
+            'content': self.description,
+            'incident_date': format_date(self.incident_date),
+            'status': self.status,
+            'date': created_at[:10],
+            'created_at': created_at,
+            'user': {
+                'name': self.user_name,
+                'last_name': self.user_last_name,
+                'initials': self.avatar_initials or f"{self.user_name[0]}{self.user_last_name[0]}".upper()
+            },
+            'user_image': self.user_image or "",
+            'admin_image': self.admin_image or "",
+            'priority': 'media'
+        }
+
+
+class TicketSearchRow(TicketListRow):
+    """Fila del listado con la relevancia FULLTEXT como última columna"""
+
+    __slots__ = ('score',)
+
+    def __init__(self, row):
+        super().__init__(row)
+        self.score = row[13]
+
+
+class TicketDetailRow:
+    """Ticket con su autor y la respuesta del admin (columnas de COLUMNS y,
+    opcionalmente, las dos imágenes)"""
+
+    COLUMNS = """c.id, c.complaint_type, c.category, c.subject, c.description, c.incident_date,
+               c.status, c.created_at, u.name, u.last_name, u.email, u.study_area, u.term,
+               cr.assigned_to, cr.admin_response, cr.resolution_date, cr.time_spent"""
+
+    __slots__ = (
+        'id', 'complaint_type', 'category', 'subject', 'description', 'incident_date',
+        'status', 'created_at', 'user_name', 'user_last_name', 'user_email', 'study_area',
+        'term', 'assigned_to', 'admin_response', 'resolution_date', 'time_spent',
+        'user_image', 'admin_image'
+    )
+
+    def __init__(self, row):
+        (self.id, self.complaint_type, self.category, self.subject, self.description,
+         self.incident_date, self.status, self.created_at, self.user_name,
+         self.user_last_name, self.user_email, self.study_area, self.term,
+         self.assigned_to, self.admin_response, self.resolution_date, self.time_spent) = row[:17]
+        self.user_image, self.admin_image = row[17:19] if len(row) >= 19 else (None, None)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'complaint_type': self.complaint_type,
+            'category': self.category,
+            'categoryName': category_name(self.category),
+            'subject': self.subject,
+            'description': self.description,
+            'incident_date': format_date(self.incident_date),
+            'status': self.status,
+            'created_at': format_datetime(self.created_at),
+            'user': {
+                'name': self.user_name,
+                'last_name': self.user_last_name,
+                'email': self.user_email,
+                'study_area': self.study_area,
+                'term': self.term
+            },
+            'response': {
+                'assigned_to': self.assigned_to,
+                'admin_response': self.admin_response,
+                'resolution_date': format_date(self.resolution_date),
+                'time_spent': float(self.time_spent) if self.time_spent is not None else None
+            },
+            'user_image': self.user_image or "",
+            'admin_image': self.admin_image or ""
+        }
+
+
+def ticket_list_items(rows):
+    return [row.to_dict() for row in rows]
+
+
+def ticket_ndjson_lines(rows):
+    """Líneas NDJSON ya codificadas de un lote de filas del listado (TicketListRow)"""
+    return "".join(dumps(row.to_dict()) + "\n" for row in rows)